@@ -2,11 +2,13 @@
 """
 Route module for the API
 """
+from math import ceil
 from os import getenv
 
 from flask import Flask, abort, jsonify, request
 from flask_cors import CORS
 
+from api.v1.auth.rate_limit import RateLimitExceeded
 from api.v1.views import app_views
 
 app = Flask(__name__)
@@ -36,6 +38,10 @@ elif AUTH_TYPE == "session_db_auth":
     from .auth.session_db_auth import SessionDBAuth
 
     auth = SessionDBAuth()
+elif AUTH_TYPE == "session_token_auth":
+    from .auth.session_token_auth import SessionTokenAuth
+
+    auth = SessionTokenAuth()
 
 
 @app.before_request
@@ -78,6 +84,14 @@ def forbidden(error) -> str:
     return jsonify({"error": "Forbidden"}), 403
 
 
+@app.errorhandler(RateLimitExceeded)
+def too_many_requests(error) -> str:
+    """Too many requests handler"""
+    response = jsonify({"error": "Too many requests"})
+    response.headers["Retry-After"] = str(ceil(error.retry_after))
+    return response, 429
+
+
 if __name__ == "__main__":
     host = getenv("API_HOST", "0.0.0.0")
     port = getenv("API_PORT", "5000")
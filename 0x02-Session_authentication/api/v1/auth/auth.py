@@ -4,12 +4,16 @@
 import os
 from typing import List, TypeVar
 
+from .rate_limit import get_login_rate_limiter
+
 
 class Auth:
     """Auth class
     Manages API authentication.
     """
 
+    login_rate_limiter = get_login_rate_limiter()
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """Checks if a path requires authentication.
 
@@ -73,3 +77,54 @@ class Auth:
         session_name = os.getenv("SESSION_NAME", "_my_session_id")
 
         return request.cookies.get(session_name)
+
+    def check_login_rate(self, request=None, email: str = None):
+        """Count a login attempt against the rate limits.
+
+        Args:
+            request (flask.request, optional): Flask request. Defaults to
+                None.
+            email (str, optional): The email the client tries to log in as.
+                Defaults to None.
+
+        Raises:
+            RateLimitExceeded: If the client or the email made too many login
+                attempts.
+        """
+        if self.login_rate_limiter is None or request is None:
+            return
+
+        self.login_rate_limiter.check(request.remote_addr, email)
+
+    def check_login_allowed(self, request=None, email: str = None):
+        """Check the rate limits before verifying credentials, without
+        counting an attempt.
+
+        Args:
+            request (flask.request, optional): Flask request. Defaults to
+                None.
+            email (str, optional): The email the client tries to log in as.
+                Defaults to None.
+
+        Raises:
+            RateLimitExceeded: If the client or the email made too many
+                failed attempts.
+        """
+        if self.login_rate_limiter is None or request is None:
+            return
+
+        self.login_rate_limiter.check_allowed(request.remote_addr, email)
+
+    def count_failed_login(self, request=None, email: str = None):
+        """Count a failed login attempt against the rate limits.
+
+        Args:
+            request (flask.request, optional): Flask request. Defaults to
+                None.
+            email (str, optional): The email the client tried to log in as.
+                Defaults to None.
+        """
+        if self.login_rate_limiter is None or request is None:
+            return
+
+        self.login_rate_limiter.count_failure(request.remote_addr, email)
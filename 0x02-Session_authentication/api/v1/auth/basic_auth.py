@@ -1,17 +1,22 @@
 #!/usr/bin/env python3
 """BasicAuth module"""
 
+import hashlib
 from base64 import urlsafe_b64decode
 from typing import TypeVar
 
 from models.user import User
 
 from .auth import Auth
+from .single_flight import SingleFlight
 
 
 class BasicAuth(Auth):
     """BasicAuth class"""
 
+    # Concurrent requests with the same credentials share one verification
+    credentials_flight = SingleFlight()
+
     def extract_base64_authorization_header(
         self, authorization_header: str
     ) -> str:
@@ -99,6 +104,9 @@ class BasicAuth(Auth):
         if not user_pwd or not isinstance(user_pwd, str):
             return None
 
+        if not User.email_may_exist(user_email):
+            return None
+
         try:
             users = User.search({"email": user_email})
         except KeyError:  # If there are no users loaded into DATA
@@ -131,6 +139,20 @@ class BasicAuth(Auth):
             credentials_base64
         )
         user_email, user_pwd = self.extract_user_credentials(credentials_utf8)
-        user = self.user_object_from_credentials(user_email, user_pwd)
+        if user_email is None or user_pwd is None:
+            return None
+
+        # Credentials come with every request: only failures use up tokens
+        self.check_login_allowed(request, user_email)
+
+        user = self.credentials_flight.do(
+            hashlib.sha256(credentials_utf8.encode()).digest(),
+            self.user_object_from_credentials,
+            user_email,
+            user_pwd,
+        )
+
+        if user is None:
+            self.count_failed_login(request, user_email)
 
         return user
@@ -1,16 +1,30 @@
 #!/usr/bin/env python3
 """SessionAuth module"""
 
+import threading
+from typing import Any
 from uuid import uuid4
 
 from .auth import Auth
+from .session_store import get_session_store
+from models.bloom_filter import BloomFilter
 from models.user import User
 
 
 class SessionAuth(Auth):
     """SessionAuth class"""
 
-    user_id_by_session_id = {}
+    user_id_by_session_id = get_session_store()
+    # Ids of the sessions of this process. Sessions of a shared store may be
+    # created by another process, so they can't be filtered. Expired
+    # sessions are only dropped when the filter is rebuilt, which happens
+    # once it holds more ids than its capacity.
+    session_filter = (
+        None if user_id_by_session_id.shared else BloomFilter()
+    )
+    # Held while creating a session and rebuilding the filter, so a rebuild
+    # never misses a session being created
+    _session_filter_lock = threading.Lock()
 
     def create_session(self, user_id: str = None) -> str:
         """Creates a session id for a user_id.
@@ -28,9 +42,64 @@ class SessionAuth(Auth):
             return None
 
         session_id = str(uuid4())
-        self.user_id_by_session_id[session_id] = user_id
+        value = self._session_value(user_id)
+        if self.session_filter is None:
+            created = self.user_id_by_session_id.create(session_id, value)
+        else:
+            with self._session_filter_lock:
+                self.session_filter.add(session_id)
+                created = self.user_id_by_session_id.create(session_id, value)
+                if self.session_filter.count > self.session_filter.capacity:
+                    self._rebuild_session_filter()
+
+        return session_id if created else None
+
+    def _rebuild_session_filter(self):
+        """Drop the expired sessions from the store, and fill a new session
+        filter with the ids of the others. Called with _session_filter_lock
+        held.
+        """
+        session_ids = []
+        for session_id, value in self.user_id_by_session_id.items():
+            if self._session_expired(session_id, value):
+                self.user_id_by_session_id.pop(session_id)
+            else:
+                session_ids.append(session_id)
+
+        capacity = self.session_filter.capacity
+        while capacity < 2 * len(session_ids):
+            capacity *= 2
+
+        session_filter = BloomFilter(capacity)
+        for session_id in session_ids:
+            session_filter.add(session_id)
+
+        session_filter.checks = self.session_filter.checks
+        session_filter.rejections = self.session_filter.rejections
+        SessionAuth.session_filter = session_filter
 
-        return session_id
+    def _session_expired(self, session_id: str, value: Any) -> bool:
+        """Check if a session expired.
+
+        Args:
+            session_id (str): The session id.
+            value (Any): The value of the session.
+
+        Returns:
+            bool: False, sessions of SessionAuth never expire.
+        """
+        return False
+
+    def _session_value(self, user_id: str):
+        """Value stored for a new session of a user.
+
+        Args:
+            user_id (str): The user id.
+
+        Returns:
+            str: The user id.
+        """
+        return user_id
 
     def user_id_for_session_id(self, session_id: str = None) -> str:
         """Retrieve user id based on session id.
@@ -60,6 +129,14 @@ class SessionAuth(Auth):
             User: A user instance,
         """
         session_id = self.session_cookie(request)
+
+        if (
+            self.session_filter is not None
+            and isinstance(session_id, str)
+            and not self.session_filter.might_contain(session_id)
+        ):
+            return None
+
         user_id = self.user_id_for_session_id(session_id)
 
         return User.get(user_id)
@@ -84,6 +161,35 @@ class SessionAuth(Auth):
         if user_id is None:
             return False
 
-        del self.user_id_by_session_id[session_id]
+        if self.user_id_by_session_id.pop(session_id) is None:
+            return False  # Destroyed by another request in the meantime
+
+        if self.session_filter is not None:
+            self.session_filter.remove(session_id)
 
         return True
+
+    def destroy_user_sessions(self, user_id: str = None) -> int:
+        """Destroy all the sessions of a user.
+
+        Args:
+            user_id (str, optional): Id of the user. Defaults to None.
+
+        Returns:
+            int: The number of sessions destroyed.
+        """
+        if user_id is None:
+            return 0
+
+        destroyed = 0
+        for session_id in self.user_id_by_session_id.session_ids_for_user(
+            user_id
+        ):
+            if self.user_id_by_session_id.pop(session_id) is None:
+                continue
+
+            if self.session_filter is not None:
+                self.session_filter.remove(session_id)
+            destroyed += 1
+
+        return destroyed
@@ -1,17 +1,70 @@
 #!/usr/bin/env python3
 """SessionDBAuth module"""
 
+from datetime import datetime, timezone
+from os import getenv
+from threading import Timer
+from typing import Dict, Tuple
+
 from .session_exp_auth import SessionExpAuth
 from models.user_session import UserSession
 
 
 class SessionDBAuth(SessionExpAuth):
-    """SessionDBAuth class"""
+    """SessionDBAuth class
+
+    Sessions are resolved from the session store. With a store local to the
+    process, they're also persisted in the UserSession file. A shared store
+    persists the sessions of every worker itself: the file, loaded once and
+    rewritten whole by each process, would lose the sessions of the others.
+    """
 
     def __init__(self):
         """Initialize a new SessionDBAuth instance"""
         super().__init__()
-        UserSession.load_from_file()
+        self.use_file = not self.user_id_by_session_id.shared
+        if self.use_file:
+            UserSession.load_from_file()
+
+        if getenv("SESSION_COMPACT_ON_START", "").lower() in ("1", "true"):
+            self.compact()
+
+        try:
+            compact_interval = int(getenv("SESSION_COMPACT_INTERVAL", 0))
+        except ValueError:
+            compact_interval = 0
+
+        if compact_interval > 0:
+            self._schedule_compaction(compact_interval)
+
+    def compact(self) -> Tuple[int, int]:
+        """Drop the expired sessions from the UserSession store.
+
+        The shared store deletes its expired sessions by itself.
+
+        Returns:
+            Tuple[int, int]: The number of sessions removed and the number of
+                bytes reclaimed on disk.
+        """
+        if not self.use_file:
+            return 0, 0
+
+        return UserSession.prune(self.session_duration)
+
+    def _schedule_compaction(self, interval: int):
+        """Run compact every interval seconds in a daemon thread.
+
+        Args:
+            interval (int): Seconds between two compactions.
+        """
+
+        def run():
+            self.compact()
+            self._schedule_compaction(interval)
+
+        timer = Timer(interval, run)
+        timer.daemon = True
+        timer.start()
 
     def create_session(self, user_id=None):
         """Creates a session id for a user_id.
@@ -24,39 +77,42 @@ class SessionDBAuth(SessionExpAuth):
         """
         session_id = super().create_session(user_id)
 
-        if session_id is None:
-            return None
+        if session_id is None or not self.use_file:
+            return session_id
 
-        user_session = UserSession(user_id=user_id, session_id=session_id)
+        user_session = UserSession(
+            id=session_id, user_id=user_id, session_id=session_id
+        )
         user_session.save()
 
         return session_id
 
-    def user_id_for_session_id(self, session_id=None):
-        """Retrieve user id based on session id.
+    def _save_touches(self, touches: Dict[str, datetime]):
+        """Save the last use of sessions, and rewrite the UserSession store
+        once for the whole batch.
 
         Args:
-            session_id (str, optional): Current session id. Defaults to None.
-
-        Returns:
-            str: The user id corresponding to the session.
+            touches (Dict[str, datetime]): Last use of each touched session.
         """
-        if session_id is None:
-            return None
+        super()._save_touches(touches)
 
-        if not isinstance(session_id, str):
-            return None
+        if not self.use_file:
+            return
 
-        if super().user_id_for_session_id(session_id) is None:
-            # Expired session
-            return None
+        touched = 0
+        for session_id, last_seen in touches.items():
+            user_session = UserSession.get_by_session_id(session_id)
+            if user_session is None:
+                continue
 
-        try:
-            user_session = UserSession.search({"session_id": session_id})[0]
-        except IndexError:
-            return None
+            # Touches are in local time, UserSessions in UTC
+            user_session.updated_at = last_seen.astimezone(
+                timezone.utc
+            ).replace(tzinfo=None)
+            touched += 1
 
-        return user_session.user_id
+        if touched:
+            UserSession.save_to_file()
 
     def destroy_session(self, request=None):
         """Destroy a session.
@@ -67,18 +123,33 @@ class SessionDBAuth(SessionExpAuth):
         Returns:
             Bool: True if a session was found ad deleted, else False.
         """
-        session_destroyed = super().destroy_session(request)
-
-        if not session_destroyed:
+        if not super().destroy_session(request):
             return False
 
-        try:
-            user_session = UserSession.search(
-                {"session_id": self.session_cookie(request)}
-            )[0]
-        except IndexError:
-            return False
-
-        user_session.remove()
+        if self.use_file:
+            user_session = UserSession.get_by_session_id(
+                self.session_cookie(request)
+            )
+            if user_session is not None:
+                user_session.remove()
 
         return True
+
+    def destroy_user_sessions(self, user_id=None):
+        """Destroy all the sessions of a user.
+
+        Args:
+            user_id (str, optional): Id of the user. Defaults to None.
+
+        Returns:
+            int: The number of sessions destroyed.
+        """
+        if user_id is None:
+            return 0
+
+        session_ids = self.user_id_by_session_id.session_ids_for_user(user_id)
+        destroyed = super().destroy_user_sessions(user_id)
+        if self.use_file:
+            UserSession.remove_sessions(session_ids)
+
+        return destroyed
@@ -1,42 +1,61 @@
 #!/usr/bin/env python3
 """SessionExpAuth module"""
 
+import atexit
+import threading
 from datetime import datetime, timedelta
 from os import getenv
+from typing import Any, Dict
 
 from .session_auth import SessionAuth
 
 
 class SessionExpAuth(SessionAuth):
-    """SessionExpAuth class"""
+    """SessionExpAuth class
+
+    Sessions expire SESSION_DURATION seconds after their creation. With
+    SESSION_SLIDING enabled they expire SESSION_DURATION seconds after their
+    last use instead. The last use of a session is refreshed at most once
+    every SESSION_TOUCH_INTERVAL seconds, and the refreshes are buffered and
+    written to the store in batches of SESSION_TOUCH_BATCH.
+    """
 
     def __init__(self):
         """Initialize a new SessionExpAuth instance"""
         try:
             self.session_duration = int(getenv("SESSION_DURATION"))
-        except ValueError:
+        except (TypeError, ValueError):
             self.session_duration = 0
 
-    def create_session(self, user_id=None):
-        """Create a user session.
+        self.sliding = getenv("SESSION_SLIDING", "").lower() in ("1", "true")
 
-        Args:
-            user_id (str, optional): The user id. Defaults to None.
+        try:
+            self.touch_interval = int(getenv("SESSION_TOUCH_INTERVAL", 60))
+        except ValueError:
+            self.touch_interval = 60
 
-        Returns:
-            str: The session id.
-        """
-        session_id = super().create_session(user_id)
+        try:
+            self.touch_batch = int(getenv("SESSION_TOUCH_BATCH", 100))
+        except ValueError:
+            self.touch_batch = 100
 
-        if session_id is None:
-            return None
+        self._touches = {}
+        self._touches_lock = threading.Lock()
+        self._last_flush = datetime.now()
+
+        if self.sliding:
+            atexit.register(self.flush_touches)
 
-        self.user_id_by_session_id[session_id] = {
-            "user_id": user_id,
-            "created_at": datetime.now(),
-        }
+    def _session_value(self, user_id: str) -> dict:
+        """Value stored for a new session of a user.
 
-        return session_id
+        Args:
+            user_id (str): The user id.
+
+        Returns:
+            dict: The user id and the creation time of the session.
+        """
+        return {"user_id": user_id, "created_at": datetime.now()}
 
     def user_id_for_session_id(self, session_id=None):
         """Retrieve user id based on session id.
@@ -61,14 +80,108 @@ class SessionExpAuth(SessionAuth):
         if self.session_duration <= 0:
             return session_dictionary.get("user_id")
 
-        if session_dictionary.get("created_at") is None:
+        now = datetime.now()
+        if self._session_expired(session_id, session_dictionary, now):
             return None
 
-        if (
-            session_dictionary.get("created_at")
-            + timedelta(seconds=self.session_duration)
-            < datetime.now()
-        ):
-            return None
+        if self.sliding and now - self._last_seen(
+            session_id, session_dictionary
+        ) >= timedelta(seconds=self.touch_interval):
+            self._touch(session_id, now)
 
         return session_dictionary.get("user_id")
+
+    def _last_seen(
+        self, session_id: str, session_dictionary: dict
+    ) -> datetime:
+        """Get the last use of a session: its creation, or its latest
+        refresh with sliding sessions.
+
+        Args:
+            session_id (str): The session id.
+            session_dictionary (dict): The value of the session.
+
+        Returns:
+            datetime: The last use of the session.
+        """
+        last_seen = session_dictionary.get("created_at")
+
+        if self.sliding:
+            last_seen = max(
+                last_seen,
+                session_dictionary.get("last_seen", last_seen),
+                self._touches.get(session_id, last_seen),
+            )
+
+        return last_seen
+
+    def _session_expired(
+        self, session_id: str, value: Any, now: datetime = None
+    ) -> bool:
+        """Check if a session expired.
+
+        Args:
+            session_id (str): The session id.
+            value (Any): The value of the session.
+            now (datetime, optional): Current time. Defaults to the time of
+                the call.
+
+        Returns:
+            bool: True if the session expired or has no creation time.
+        """
+        if self.session_duration <= 0:
+            return False
+
+        if not isinstance(value, dict) or value.get("created_at") is None:
+            return True
+
+        if now is None:
+            now = datetime.now()
+
+        return self._last_seen(session_id, value) + timedelta(
+            seconds=self.session_duration
+        ) < now
+
+    def _touch(self, session_id: str, now: datetime):
+        """Buffer a refresh of the last use of a session.
+
+        The buffer is flushed once it holds touch_batch sessions or once
+        touch_interval seconds went by since the last flush.
+
+        Args:
+            session_id (str): The session id.
+            now (datetime): Time of the last use of the session.
+        """
+        with self._touches_lock:
+            self._touches[session_id] = now
+            if len(self._touches) < self.touch_batch and (
+                now - self._last_flush
+                < timedelta(seconds=self.touch_interval)
+            ):
+                return
+
+        self.flush_touches()
+
+    def flush_touches(self):
+        """Write the buffered session refreshes to the store."""
+        with self._touches_lock:
+            touches = self._touches
+            self._touches = {}
+            self._last_flush = datetime.now()
+
+        if touches:
+            self._save_touches(touches)
+
+    def _save_touches(self, touches: Dict[str, datetime]):
+        """Save the last use of sessions.
+
+        Args:
+            touches (Dict[str, datetime]): Last use of each touched session.
+        """
+        for session_id, last_seen in touches.items():
+            session_dictionary = self.user_id_by_session_id.get(session_id)
+            if session_dictionary is None:
+                continue
+
+            session_dictionary = dict(session_dictionary, last_seen=last_seen)
+            self.user_id_by_session_id.update(session_id, session_dictionary)
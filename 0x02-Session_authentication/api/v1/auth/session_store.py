@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""Session stores module
+
+A session store maps session ids to the values SessionAuth and its
+subclasses keep for a session. The backend is chosen through the env
+variable SESSION_STORE:
+
+- `memory` (default): a dict local to the process.
+- `sqlite`: a SQLite database in WAL mode shared by every worker process
+    on the host. Its path is set through SESSION_STORE_PATH and defaults to
+    `.db_sessions.sqlite3`. Sessions expired for SESSION_DURATION seconds
+    are deleted from it periodically.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from os import getenv
+from typing import Any, List, Optional, Tuple
+
+
+class SessionStore(ABC):
+    """SessionStore class
+    Interface of the session stores. Behaves like a dict.
+    """
+
+    # True if the sessions are visible to every worker process
+    shared = False
+
+    @abstractmethod
+    def get(self, session_id: str, default: Any = None) -> Any:
+        """Get the value of a session.
+
+        Args:
+            session_id (str): The session id.
+            default (Any, optional): Returned if the session doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Any: The value of the session.
+        """
+
+    @abstractmethod
+    def __setitem__(self, session_id: str, value: Any):
+        """Set the value of a session"""
+
+    @abstractmethod
+    def create(self, session_id: str, value: Any) -> bool:
+        """Set the value of a session unless it already exists, atomically.
+
+        Args:
+            session_id (str): The session id.
+            value (Any): The value of the session.
+
+        Returns:
+            bool: True if the session was created, False if it existed.
+        """
+
+    @abstractmethod
+    def update(self, session_id: str, value: Any) -> bool:
+        """Set the value of a session if it exists, atomically.
+
+        Args:
+            session_id (str): The session id.
+            value (Any): The new value of the session.
+
+        Returns:
+            bool: True if the session was updated, False if it doesn't exist.
+        """
+
+    @abstractmethod
+    def pop(self, session_id: str, default: Any = None) -> Any:
+        """Remove a session and return its value, atomically.
+
+        Args:
+            session_id (str): The session id.
+            default (Any, optional): Returned if the session doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Any: The value of the removed session.
+        """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of sessions in the store"""
+
+    @abstractmethod
+    def items(self) -> List[Tuple[str, Any]]:
+        """Get a snapshot of the sessions.
+
+        Returns:
+            List[Tuple[str, Any]]: The id and value of each session.
+        """
+
+    @abstractmethod
+    def session_ids_for_user(self, user_id: str) -> List[str]:
+        """Get the ids of the sessions of a user.
+
+        Args:
+            user_id (str): The user id.
+
+        Returns:
+            List[str]: The session ids.
+        """
+
+    def __getitem__(self, session_id: str) -> Any:
+        """Get the value of a session, raises KeyError if it doesn't exist"""
+        value = self.get(session_id)
+        if value is None:
+            raise KeyError(session_id)
+        return value
+
+    def __delitem__(self, session_id: str):
+        """Remove a session, raises KeyError if it doesn't exist"""
+        if self.pop(session_id) is None:
+            raise KeyError(session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        """Check if a session exists"""
+        return self.get(session_id) is not None
+
+
+def _user_id(value: Any) -> str:
+    """Get the user id of a session value, None if it has none"""
+    if isinstance(value, dict):
+        return value.get("user_id")
+    return value if isinstance(value, str) else None
+
+
+def _expires_at(value: Any, session_duration: int) -> Optional[float]:
+    """Get the expiry of a session value, in seconds since the epoch.
+
+    Revocations of signed tokens carry their expiry, and sessions with a
+    creation time expire session_duration seconds after their creation or
+    last use.
+
+    Args:
+        value (Any): The session value.
+        session_duration (int): Lifetime of the sessions in seconds, they
+            never expire if 0 or less.
+
+    Returns:
+        Optional[float]: The expiry, None if the session never expires.
+    """
+    if not isinstance(value, dict):
+        return None
+
+    if "expires_at" in value:
+        return value["expires_at"] or None
+
+    created_at = value.get("created_at")
+    if session_duration <= 0 or not isinstance(created_at, datetime):
+        return None
+
+    last_seen = max(created_at, value.get("last_seen") or created_at)
+    return last_seen.timestamp() + session_duration
+
+
+class DictSessionStore(SessionStore):
+    """DictSessionStore class
+    Keeps the sessions in a dict local to the process, along with the
+    session ids of each user. Both are split in stripes guarded by their own
+    lock, so threads working on different sessions rarely wait on each
+    other.
+    """
+
+    def __init__(self, stripes: int = 16):
+        """Initialize a new DictSessionStore
+
+        Args:
+            stripes (int, optional): Number of stripes. Defaults to 16.
+        """
+        self._stripes = [({}, threading.Lock()) for _ in range(stripes)]
+        self._user_stripes = [({}, threading.Lock()) for _ in range(stripes)]
+
+    def _stripe(self, session_id: str) -> Tuple[dict, threading.Lock]:
+        """Get the sessions and lock of the stripe holding a session"""
+        return self._stripes[hash(session_id) % len(self._stripes)]
+
+    def get(self, session_id, default=None):
+        """Get the value of a session"""
+        sessions, lock = self._stripe(session_id)
+        with lock:
+            return sessions.get(session_id, default)
+
+    def __setitem__(self, session_id, value):
+        """Set the value of a session"""
+        sessions, lock = self._stripe(session_id)
+        with lock:
+            self._unindex(session_id, sessions.get(session_id))
+            sessions[session_id] = value
+            self._index(session_id, value)
+
+    def create(self, session_id, value):
+        """Set the value of a session unless it already exists"""
+        sessions, lock = self._stripe(session_id)
+        with lock:
+            if session_id in sessions:
+                return False
+            sessions[session_id] = value
+            self._index(session_id, value)
+        return True
+
+    def update(self, session_id, value):
+        """Set the value of a session if it exists"""
+        sessions, lock = self._stripe(session_id)
+        with lock:
+            if session_id not in sessions:
+                return False
+            self._unindex(session_id, sessions[session_id])
+            sessions[session_id] = value
+            self._index(session_id, value)
+        return True
+
+    def pop(self, session_id, default=None):
+        """Remove a session and return its value"""
+        sessions, lock = self._stripe(session_id)
+        with lock:
+            value = sessions.pop(session_id, None)
+            if value is None:
+                return default
+            self._unindex(session_id, value)
+        return value
+
+    def __len__(self):
+        """Number of sessions in the store"""
+        return sum(len(sessions) for sessions, _ in self._stripes)
+
+    def items(self):
+        """Get a snapshot of the sessions"""
+        snapshot = []
+        for sessions, lock in self._stripes:
+            with lock:
+                snapshot.extend(sessions.items())
+        return snapshot
+
+    def session_ids_for_user(self, user_id):
+        """Get the ids of the sessions of a user"""
+        session_ids_by_user, lock = self._user_stripe(user_id)
+        with lock:
+            return list(session_ids_by_user.get(user_id, ()))
+
+    def _user_stripe(self, user_id: str) -> Tuple[dict, threading.Lock]:
+        """Get the session ids and lock of the stripe holding a user"""
+        return self._user_stripes[hash(user_id) % len(self._user_stripes)]
+
+    def _index(self, session_id: str, value: Any):
+        """Add a session to the session ids of its user"""
+        user_id = _user_id(value)
+        if user_id is None:
+            return
+
+        session_ids_by_user, lock = self._user_stripe(user_id)
+        with lock:
+            session_ids_by_user.setdefault(user_id, set()).add(session_id)
+
+    def _unindex(self, session_id: str, value: Any):
+        """Remove a session from the session ids of its user"""
+        user_id = _user_id(value)
+        if user_id is None:
+            return
+
+        session_ids_by_user, lock = self._user_stripe(user_id)
+        with lock:
+            session_ids = session_ids_by_user.get(user_id)
+            if session_ids is None:
+                return
+
+            session_ids.discard(session_id)
+            if len(session_ids) == 0:
+                del session_ids_by_user[user_id]
+
+
+def _encode(value: Any) -> str:
+    """Serialize a session value to JSON, datetimes included"""
+
+    def default(obj):
+        if isinstance(obj, datetime):
+            return {"__datetime__": obj.isoformat()}
+        raise TypeError("{} is not serializable".format(type(obj).__name__))
+
+    return json.dumps(value, default=default)
+
+
+def _decode(value: str) -> Any:
+    """Deserialize a session value encoded by _encode"""
+
+    def object_hook(obj):
+        if "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+        return obj
+
+    return json.loads(value, object_hook=object_hook)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLiteSessionStore class
+    Keeps the sessions in a SQLite database in WAL mode, so every worker
+    process on the host sees the same sessions. Each thread uses its own
+    connection.
+
+    Each session is stored with its expiry, and the sessions expired for
+    more than `grace` seconds are deleted when the store opens and every
+    PURGE_EVERY writes.
+    """
+
+    shared = True
+    PURGE_EVERY = 1024
+
+    def __init__(
+        self, db_path: str, session_duration: int = 0, grace: int = 0
+    ):
+        """Initialize a new SQLiteSessionStore
+
+        Args:
+            db_path (str): Path of the SQLite database.
+            session_duration (int, optional): Lifetime of the sessions in
+                seconds, they never expire if 0 or less. Defaults to 0.
+            grace (int, optional): Seconds an expired session is kept before
+                being deleted. Defaults to 0.
+        """
+        self.db_path = db_path
+        self.session_duration = session_duration
+        self.grace = grace
+        self._local = threading.local()
+        self._writes = 0
+
+        with self._connection as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "user_id TEXT"
+                ") WITHOUT ROWID"
+            )
+            columns = [
+                row[1] for row in conn.execute("PRAGMA table_info(sessions)")
+            ]
+            if "user_id" not in columns:
+                conn.execute("ALTER TABLE sessions ADD COLUMN user_id TEXT")
+            if "expires_at" not in columns:
+                conn.execute("ALTER TABLE sessions ADD COLUMN expires_at REAL")
+                conn.executemany(
+                    "UPDATE sessions SET expires_at = ? WHERE session_id = ?",
+                    [
+                        (self._expires_at(_decode(value)), session_id)
+                        for session_id, value in conn.execute(
+                            "SELECT session_id, value FROM sessions"
+                        ).fetchall()
+                    ],
+                )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_user_id "
+                "ON sessions (user_id)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_expires_at "
+                "ON sessions (expires_at)"
+            )
+
+        self.purge_expired()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """Connection of the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _expires_at(self, value: Any) -> Optional[float]:
+        """Get the expiry of a session value, None if it never expires"""
+        return _expires_at(value, self.session_duration)
+
+    def _wrote(self):
+        """Count a write, and purge the expired sessions every PURGE_EVERY"""
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """Delete the sessions expired for more than `grace` seconds.
+
+        Args:
+            now (Optional[float], optional): Current time in seconds since
+                the epoch. Defaults to the time of the call.
+
+        Returns:
+            int: The number of deleted sessions.
+        """
+        if now is None:
+            now = time.time()
+
+        with self._connection as conn:
+            cursor = conn.execute(
+                "DELETE FROM sessions WHERE expires_at <= ?",
+                (now - self.grace,),
+            )
+        return cursor.rowcount
+
+    def get(self, session_id, default=None):
+        """Get the value of a session"""
+        row = self._connection.execute(
+            "SELECT value FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return default if row is None else _decode(row[0])
+
+    def __setitem__(self, session_id, value):
+        """Set the value of a session"""
+        with self._connection as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions "
+                "(session_id, value, user_id, expires_at) VALUES (?, ?, ?, ?)",
+                (
+                    session_id,
+                    _encode(value),
+                    _user_id(value),
+                    self._expires_at(value),
+                ),
+            )
+        self._wrote()
+
+    def create(self, session_id, value):
+        """Set the value of a session unless it already exists"""
+        with self._connection as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO sessions "
+                "(session_id, value, user_id, expires_at) VALUES (?, ?, ?, ?)",
+                (
+                    session_id,
+                    _encode(value),
+                    _user_id(value),
+                    self._expires_at(value),
+                ),
+            )
+        self._wrote()
+        return cursor.rowcount == 1
+
+    def update(self, session_id, value):
+        """Set the value of a session if it exists"""
+        with self._connection as conn:
+            cursor = conn.execute(
+                "UPDATE sessions SET value = ?, user_id = ?, expires_at = ? "
+                "WHERE session_id = ?",
+                (
+                    _encode(value),
+                    _user_id(value),
+                    self._expires_at(value),
+                    session_id,
+                ),
+            )
+        self._wrote()
+        return cursor.rowcount == 1
+
+    def pop(self, session_id, default=None):
+        """Remove a session and return its value"""
+        with self._connection as conn:
+            row = conn.execute(
+                "DELETE FROM sessions WHERE session_id = ? RETURNING value",
+                (session_id,),
+            ).fetchone()
+        return default if row is None else _decode(row[0])
+
+    def __len__(self):
+        """Number of sessions in the store"""
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM sessions"
+        ).fetchone()[0]
+
+    def items(self):
+        """Get a snapshot of the sessions"""
+        return [
+            (session_id, _decode(value))
+            for session_id, value in self._connection.execute(
+                "SELECT session_id, value FROM sessions"
+            )
+        ]
+
+    def session_ids_for_user(self, user_id):
+        """Get the ids of the sessions of a user"""
+        return [
+            row[0]
+            for row in self._connection.execute(
+                "SELECT session_id FROM sessions WHERE user_id = ?", (user_id,)
+            )
+        ]
+
+
+def get_session_store() -> SessionStore:
+    """Create the session store configured through SESSION_STORE.
+
+    Raises:
+        ValueError: If SESSION_STORE names an unknown backend.
+
+    Returns:
+        SessionStore: The session store.
+    """
+    backend = getenv("SESSION_STORE", "memory")
+
+    if backend == "memory":
+        return DictSessionStore()
+
+    if backend == "sqlite":
+        try:
+            session_duration = int(getenv("SESSION_DURATION"))
+        except (TypeError, ValueError):
+            session_duration = 0
+
+        # A sliding session may have been used since its stored last use,
+        # without its refresh written yet: keep it one more lifetime
+        sliding = getenv("SESSION_SLIDING", "").lower() in ("1", "true")
+
+        return SQLiteSessionStore(
+            getenv("SESSION_STORE_PATH", ".db_sessions.sqlite3"),
+            session_duration,
+            session_duration if sliding else 0,
+        )
+
+    raise ValueError("Unknown session store: {}".format(backend))
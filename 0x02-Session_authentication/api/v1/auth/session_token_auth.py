@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""SessionTokenAuth module"""
+
+import hashlib
+import hmac
+import os
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Tuple
+
+from .session_auth import SessionAuth
+
+
+def _b64encode(data: bytes) -> str:
+    """Encode bytes in url safe base64 without padding"""
+    return urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    """Decode url safe base64 without padding"""
+    return urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class SessionTokenAuth(SessionAuth):
+    """SessionTokenAuth class
+
+    Sessions are stateless tokens signed with HMAC-SHA256. A token holds the
+    user id, its issue time and its expiry, so validating it only takes a
+    MAC check. Tokens are signed with the key set through SESSION_SECRET and
+    expire after SESSION_DURATION seconds (never if 0 or less).
+
+    Logged out tokens are kept in the session store until they expire. So
+    is the time a user logged out everywhere, which revokes all the tokens
+    the user was issued until then. Every worker must see the revocations,
+    so the store must be shared, and it deletes them once they expire.
+    """
+
+    REVOKED_PREFIX = "revoked:"
+    REVOKED_USER_PREFIX = "revoked_user:"
+    # Tokens are checked through their signature
+    session_filter = None
+
+    def __init__(self):
+        """Initialize a new SessionTokenAuth instance
+
+        Raises:
+            ValueError: If SESSION_SECRET is unset, or the session store
+                isn't shared by the workers.
+        """
+        secret = os.getenv("SESSION_SECRET")
+        if not secret:
+            raise ValueError("session_token_auth requires SESSION_SECRET")
+        self._secret = secret.encode()
+
+        if not self.user_id_by_session_id.shared:
+            raise ValueError(
+                "session_token_auth requires a shared session store, "
+                "set SESSION_STORE=sqlite"
+            )
+
+        try:
+            self.session_duration = int(os.getenv("SESSION_DURATION"))
+        except (TypeError, ValueError):
+            self.session_duration = 0
+
+    def _sign(self, payload: str) -> str:
+        """Compute the signature of a token payload"""
+        return _b64encode(
+            hmac.new(self._secret, payload.encode(), hashlib.sha256).digest()
+        )
+
+    def create_session(self, user_id: str = None) -> str:
+        """Create a signed session token for a user_id.
+
+        Args:
+            user_id (str, optional): Id of the user. Defaults to None.
+
+        Returns:
+            str: The session token.
+        """
+        if user_id is None:
+            return None
+
+        if not isinstance(user_id, str):
+            return None
+
+        issued_at = time.time()
+        expires_at = (
+            int(issued_at) + self.session_duration
+            if self.session_duration > 0
+            else 0
+        )
+        payload = _b64encode(
+            "{}:{:.6f}:{}:{}".format(
+                os.urandom(8).hex(), issued_at, expires_at, user_id
+            ).encode()
+        )
+
+        return "{}.{}".format(payload, self._sign(payload))
+
+    def _verify(self, session_id: str) -> Tuple[str, str, int]:
+        """Verify a session token and check it wasn't revoked.
+
+        Args:
+            session_id (str): The session token.
+
+        Returns:
+            Tuple[str, str, int]: The token id, user id and expiry of the
+                token, or (None, None, 0) if the token is invalid, expired or
+                revoked.
+        """
+        payload, _, signature = session_id.partition(".")
+
+        if not hmac.compare_digest(
+            self._sign(payload).encode(), signature.encode()
+        ):
+            return None, None, 0
+
+        try:
+            token_id, issued_at, expires_at, user_id = (
+                _b64decode(payload).decode().split(":", 3)
+            )
+            issued_at = float(issued_at)
+            expires_at = int(expires_at)
+        except ValueError:
+            return None, None, 0
+
+        if expires_at and expires_at < time.time():
+            return None, None, 0
+
+        if self.REVOKED_PREFIX + token_id in self.user_id_by_session_id:
+            return None, None, 0
+
+        user_revocation = self.user_id_by_session_id.get(
+            self.REVOKED_USER_PREFIX + user_id
+        )
+        if user_revocation and issued_at <= user_revocation["revoked_at"]:
+            return None, None, 0
+
+        return token_id, user_id, expires_at
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """Retrieve user id from a session token.
+
+        Args:
+            session_id (str, optional): Session token. Defaults to None.
+
+        Returns:
+            str: The user id of a valid token, else None.
+        """
+        if session_id is None:
+            return None
+
+        if not isinstance(session_id, str):
+            return None
+
+        _, user_id, _ = self._verify(session_id)
+
+        return user_id
+
+    def destroy_session(self, request=None):
+        """Revoke the session token of a request.
+
+        Args:
+            request (flask.request, optional): Flask request. Defaults to None.
+
+        Returns:
+            Bool: True if a valid token was found and revoked, else False.
+        """
+        if request is None:
+            return False
+
+        session_id = self.session_cookie(request)
+        if session_id is None:
+            return False
+
+        if not isinstance(session_id, str):
+            return False
+
+        token_id, _, expires_at = self._verify(session_id)
+
+        if token_id is None:
+            return False
+
+        self._revoke(self.REVOKED_PREFIX + token_id, {}, expires_at)
+
+        return True
+
+    def destroy_user_sessions(self, user_id: str = None) -> int:
+        """Revoke all the tokens issued to a user until now.
+
+        Args:
+            user_id (str, optional): Id of the user. Defaults to None.
+
+        Returns:
+            int: 1 if the tokens were revoked, else 0. The number of tokens
+                is unknown since they aren't stored.
+        """
+        if user_id is None:
+            return 0
+
+        revoked_at = time.time()
+        self._revoke(
+            self.REVOKED_USER_PREFIX + user_id,
+            {"revoked_at": revoked_at},
+            int(revoked_at) + self.session_duration
+            if self.session_duration > 0
+            else 0,
+        )
+
+        return 1
+
+    def _revoke(self, key: str, value: dict, expires_at: int):
+        """Add a revocation to the session store, which deletes it once
+        every token it revokes expired.
+
+        Args:
+            key (str): Key of the revocation.
+            value (dict): Value of the revocation.
+            expires_at (int): Expiry of the last revoked token, 0 if it never
+                expires.
+        """
+        value["expires_at"] = expires_at
+        self.user_id_by_session_id[key] = value
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""SingleFlight module"""
+
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    """An in-flight call and its outcome"""
+
+    def __init__(self):
+        """Initialize a new _Call"""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """SingleFlight class
+    Coalesces concurrent calls sharing a key into a single call.
+
+    The first caller of a key runs the function, the callers arriving while
+    it runs wait for it and get the same result or exception. Nothing is
+    kept once the call completes, so a later caller runs the function again.
+    """
+
+    def __init__(self):
+        """Initialize a new SingleFlight"""
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable, *args: Any) -> Any:
+        """Call fn(*args), unless a call with the same key is in flight, in
+        which case wait for its outcome.
+
+        Args:
+            key (Hashable): Key of the call.
+            fn (Callable): Function to call.
+
+        Returns:
+            Any: The result of the call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
@@ -28,6 +28,30 @@ def stats() -> str:
     return jsonify(stats)
 
 
+@app_views.route("/metrics", strict_slashes=False)
+def metrics() -> str:
+    """GET /api/v1/metrics
+    Return:
+      - the metrics of the Bloom filters rejecting unknown emails and
+        session ids, the number of rate limited login attempts and of
+        Basic auth checks shared with a concurrent request
+    """
+    from api.v1.app import auth
+    from models.user import User
+
+    metrics = {"email_filter": User.email_filter.metrics()}
+    session_filter = getattr(auth, "session_filter", None)
+    if session_filter is not None:
+        metrics["session_filter"] = session_filter.metrics()
+    login_rate_limiter = getattr(auth, "login_rate_limiter", None)
+    if login_rate_limiter is not None:
+        metrics["login_rate_limit_rejections"] = login_rate_limiter.rejections
+    credentials_flight = getattr(auth, "credentials_flight", None)
+    if credentials_flight is not None:
+        metrics["shared_credential_checks"] = credentials_flight.shared
+    return jsonify(metrics)
+
+
 @app_views.route("/unauthorized", strict_slashes=False)
 def unauthorized() -> str:
     """GET /api/v1/unauthorized
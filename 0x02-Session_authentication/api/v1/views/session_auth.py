@@ -22,6 +22,13 @@ def login():
     if not password:
         return jsonify({"error": "password missing"}), 400
 
+    from api.v1.app import auth
+
+    auth.check_login_rate(request, email)
+
+    if not User.email_may_exist(email):
+        return jsonify({"error": "no user found for this email"}), 404
+
     try:
         user = User.search({"email": email})[0]
     except IndexError:
@@ -30,8 +37,6 @@ def login():
     if not user.is_valid_password(password):
         return jsonify({"error": "wrong password"}), 401
 
-    from api.v1.app import auth
-
     session_id = auth.create_session(user.id)
 
     response = jsonify(user.to_json())
@@ -52,3 +57,17 @@ def logout():
         return {}, 200
 
     abort(404)
+
+
+@app_views.route("/auth_session/all", methods=["DELETE"], strict_slashes=False)
+def logout_everywhere():
+    """Logout of all the sessions of the current user"""
+
+    from api.v1.app import auth
+
+    if not hasattr(auth, "destroy_user_sessions"):
+        abort(404)
+
+    destroyed = auth.destroy_user_sessions(request.current_user.id)
+
+    return jsonify({"sessions_destroyed": destroyed}), 200
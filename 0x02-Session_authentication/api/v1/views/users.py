@@ -54,6 +54,12 @@ def delete_user(user_id: str = None) -> str:
     if user is None:
         abort(404)
     user.remove()
+
+    from api.v1.app import auth
+
+    if hasattr(auth, "destroy_user_sessions"):
+        auth.destroy_user_sessions(user.id)
+
     return jsonify({}), 200
 
 
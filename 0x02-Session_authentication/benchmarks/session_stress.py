@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Multithreaded login/logout stress benchmark
+
+Each thread logs a user in, reads its profile and logs out, over and over,
+through the API. Any lost session or server error is counted. Run it from
+the 0x02-Session_authentication directory:
+
+```Bash
+python3 benchmarks/session_stress.py --auth-type session_exp_auth -t 16
+```
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--auth-type",
+        default="session_auth",
+        choices=(
+            "session_auth",
+            "session_exp_auth",
+            "session_db_auth",
+            "session_token_auth",
+        ),
+    )
+    parser.add_argument("-t", "--threads", type=int, default=8)
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    parser.add_argument("-u", "--users", type=int, default=4)
+    return parser.parse_args()
+
+
+def main():
+    """Run the benchmark"""
+    args = parse_args()
+
+    # The API reads its configuration when it's imported
+    os.environ["AUTH_TYPE"] = args.auth_type
+    os.environ.setdefault("SESSION_NAME", "_my_session_id")
+    os.environ.setdefault("SESSION_DURATION", "3600")
+    if args.auth_type == "session_token_auth":
+        os.environ.setdefault("SESSION_SECRET", os.urandom(32).hex())
+        os.environ.setdefault("SESSION_STORE", "sqlite")
+    os.chdir(tempfile.mkdtemp(prefix="session_stress_"))
+
+    from api.v1.app import app
+    from models.user import User
+
+    emails = []
+    for i in range(args.users):
+        user = User(email="stress{}@example.com".format(i))
+        user.password = "pwd"
+        user.save()
+        emails.append(user.email)
+
+    counters = {"requests": 0, "lost_sessions": 0, "errors": 0}
+    counters_lock = threading.Lock()
+
+    def worker(index: int):
+        client = app.test_client()
+        email = emails[index % len(emails)]
+        requests = lost_sessions = errors = 0
+
+        for _ in range(args.iterations):
+            res = client.post(
+                "/api/v1/auth_session/login",
+                data={"email": email, "password": "pwd"},
+            )
+            me = client.get("/api/v1/users/me")
+            logout = client.delete("/api/v1/auth_session/logout")
+            requests += 3
+
+            if res.status_code >= 500 or logout.status_code >= 500:
+                errors += 1
+            elif me.status_code != 200 or logout.status_code != 200:
+                lost_sessions += 1
+
+        with counters_lock:
+            counters["requests"] += requests
+            counters["lost_sessions"] += lost_sessions
+            counters["errors"] += errors
+
+    threads = [
+        threading.Thread(target=worker, args=(i,))
+        for i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print("auth type:      {}".format(args.auth_type))
+    print("threads:        {}".format(args.threads))
+    print("requests:       {}".format(counters["requests"]))
+    print("elapsed:        {:.2f}s".format(elapsed))
+    print("requests/s:     {:.0f}".format(counters["requests"] / elapsed))
+    print("lost sessions:  {}".format(counters["lost_sessions"]))
+    print("server errors:  {}".format(counters["errors"]))
+
+    sys.exit(1 if counters["lost_sessions"] or counters["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Data-scale benchmark of the json file store of models/base.py
+
+Generates synthetic User and UserSession populations of growing sizes and
+measures, for each of them, `load_from_file`, `save_to_file`, `save()` of a
+single object, `search` by email (by user id for sessions), `all()`, the
+memory of the loaded objects and the size of the file. Every population is
+generated in a process and measured in another one, which starts from an
+empty store, so memory figures don't add up. Run it from the
+0x02-Session_authentication directory:
+
+```Bash
+python3 benchmarks/store_scale.py
+python3 benchmarks/store_scale.py -n 1000 -n 100000 -m User -o scale.json
+```
+
+The table ends with the empirical order of growth of each measure between
+the smallest and the largest population: 1.0 is linear in the number of
+records, 0.0 constant.
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODELS = ("User", "UserSession")
+SIZES = (1000, 100000, 1000000)
+
+# Measure, header and format of the columns of the table
+COLUMNS = (
+    ("file_mib", "file MiB", "{:>9.1f}"),
+    ("save_to_file_s", "save_all s", "{:>10.3f}"),
+    ("load_from_file_s", "load s", "{:>8.3f}"),
+    ("save_ms", "save() ms", "{:>10.1f}"),
+    ("search_ms", "search ms", "{:>10.2f}"),
+    ("all_ms", "all() ms", "{:>9.2f}"),
+    ("get_us", "get us", "{:>7.2f}"),
+    ("rss_mib", "RSS MiB", "{:>8.1f}"),
+    ("peak_rss_mib", "peak MiB", "{:>9.1f}"),
+)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-n",
+        "--size",
+        type=int,
+        action="append",
+        dest="sizes",
+        help="Number of records, repeatable (Defaults to 1k, 100k and 1M)",
+    )
+    parser.add_argument(
+        "-m", "--model", action="append", dest="models", choices=MODELS
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="Repeats of the queries and of save(), the best one is kept",
+    )
+    parser.add_argument("-o", "--output", help="Path of the json results")
+    parser.add_argument(
+        "--worker",
+        nargs=3,
+        metavar=("PHASE", "MODEL", "SIZE"),
+        help=argparse.SUPPRESS,
+    )
+    return parser.parse_args()
+
+
+def best_of(repeat: int, function: Callable[[], object]) -> float:
+    """Fastest of `repeat` calls of a function, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def rss_mib() -> float:
+    """Current resident memory of the process in MiB, from /proc"""
+    with open("/proc/self/statm") as file:
+        pages = int(file.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def users_of_sessions(size: int) -> int:
+    """Number of users owning the sessions of a population"""
+    return size // 10 or 1
+
+
+def searched(model: str, size: int) -> Tuple[str, str]:
+    """Attribute and value searched in a population, matching its last
+    record"""
+    if model == "User":
+        return "email", "user{}@example.com".format(size - 1)
+
+    return "user_id", "user-{}".format((size - 1) % users_of_sessions(size))
+
+
+def model_class(model: str) -> type:
+    """Class of a model"""
+    from models.user import User
+    from models.user_session import UserSession
+
+    return User if model == "User" else UserSession
+
+
+def generate(model: str, size: int) -> None:
+    """Fill the store of a model with synthetic records, in memory.
+
+    Records are added to DATA directly: saving them one by one would
+    rewrite the file for each of them.
+    """
+    from models.base import DATA
+
+    cls = model_class(model)
+    DATA[model] = {}
+    if model == "User":
+        template = cls()
+        template.password = "password"
+        for i in range(size):
+            user = cls(
+                email="user{}@example.com".format(i),
+                _password=template.password,
+                first_name="First{}".format(i),
+                last_name="Last{}".format(i),
+            )
+            DATA[model][user.id] = user
+        return
+
+    for i in range(size):
+        user_session = cls(
+            user_id="user-{}".format(i % users_of_sessions(size)),
+            session_id="session-{}".format(i),
+        )
+        # Stored under their session id, as SessionDBAuth does
+        user_session.id = user_session.session_id
+        DATA[model][user_session.id] = user_session
+
+
+def save_population(model: str, size: int) -> dict:
+    """Generate a population and save it to the file of its model, in the
+    current directory.
+
+    Returns:
+        dict: The time taken by the generation and by `save_to_file`, and
+            the size of the file.
+    """
+    start = time.perf_counter()
+    generate(model, size)
+    generate_s = time.perf_counter() - start
+
+    return {
+        "model": model,
+        "size": size,
+        "generate_s": generate_s,
+        "save_to_file_s": best_of(1, model_class(model).save_to_file),
+        "file_mib": os.path.getsize(".db_{}.json".format(model)) / 2**20,
+    }
+
+
+def measure(model: str, size: int, repeat: int) -> dict:
+    """Load the population saved in the current directory and measure the
+    queries.
+
+    Returns:
+        dict: The measures, in seconds, milliseconds, microseconds and MiB as
+            their names tell.
+    """
+    from models.base import DATA
+
+    cls = model_class(model)
+    attribute, value = searched(model, size)
+
+    rss_before = rss_mib()
+    load_from_file_s = best_of(1, cls.load_from_file)
+    rss = rss_mib() - rss_before
+
+    some_id = next(iter(DATA[model]))
+    search_s = best_of(repeat, lambda: cls.search({attribute: value}))
+    all_s = best_of(repeat, cls.all)
+    get_s = best_of(repeat, lambda: cls.get(some_id))
+    save_s = best_of(repeat, DATA[model][some_id].save)
+
+    return {
+        "load_from_file_s": load_from_file_s,
+        "save_ms": save_s * 1000,
+        "search_ms": search_s * 1000,
+        "all_ms": all_s * 1000,
+        "get_us": get_s * 1e6,
+        "rss_mib": rss,
+        "peak_rss_mib": (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        ),
+    }
+
+
+def run_worker(phase: str, model: str, size: int, repeat: int, cwd: str):
+    """Run a phase of the measure of a population in a new process.
+
+    Returns:
+        dict: The measures of the phase.
+    """
+    completed = subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--worker",
+            phase,
+            model,
+            str(size),
+            "--repeat",
+            str(repeat),
+        ],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def order_of_growth(results: List[dict], key: str) -> float:
+    """Empirical exponent of a measure between the smallest and the largest
+    population: measure ~ size ** exponent"""
+    small, large = results[0], results[-1]
+    if small[key] <= 0 or large[key] <= 0 or small["size"] == large["size"]:
+        return float("nan")
+
+    return math.log(large[key] / small[key]) / math.log(
+        large["size"] / small["size"]
+    )
+
+
+def print_table(model: str, results: List[dict]) -> None:
+    """Print the measures of the populations of a model"""
+    print(model)
+    print(
+        "{:>9} ".format("records")
+        + " ".join(
+            "{:>{}}".format(header, len(fmt.format(0)))
+            for _, header, fmt in COLUMNS
+        )
+    )
+    for result in results:
+        print(
+            "{:>9} ".format(result["size"])
+            + " ".join(fmt.format(result[key]) for key, _, fmt in COLUMNS)
+        )
+
+    if len(results) > 1:
+        print(
+            "{:>9} ".format("order")
+            + " ".join(
+                "{:>{}.2f}".format(
+                    order_of_growth(results, key), len(fmt.format(0))
+                )
+                for key, _, fmt in COLUMNS
+            )
+        )
+    print()
+
+
+def main():
+    """Run the benchmark"""
+    args = parse_args()
+
+    if args.worker:
+        phase, model, size = args.worker
+        if phase == "save":
+            result = save_population(model, int(size))
+        else:
+            result = measure(model, int(size), args.repeat)
+        print(json.dumps(result))
+        return
+
+    results = []
+    for model in args.models or MODELS:
+        model_results = []
+        for size in sorted(args.sizes or SIZES):
+            print("measuring {} x {}".format(size, model), file=sys.stderr)
+            directory = tempfile.mkdtemp(prefix="store_scale_")
+            try:
+                result = run_worker(
+                    "save", model, size, args.repeat, directory
+                )
+                result.update(
+                    run_worker("measure", model, size, args.repeat, directory)
+                )
+            finally:
+                shutil.rmtree(directory)
+            model_results.append(result)
+
+        print_table(model, model_results)
+        results.extend(model_results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
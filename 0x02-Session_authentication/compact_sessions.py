@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Compact the UserSession store.
+
+Drops the sessions older than SESSION_DURATION from .db_UserSession.json and
+rewrites the file atomically. Run it from the directory holding the store:
+
+```Bash
+SESSION_DURATION=60 python3 compact_sessions.py
+```
+"""
+
+import argparse
+from os import getenv
+
+from models.user_session import UserSession
+
+
+def main():
+    """Parse the command line and compact the store"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-d",
+        "--duration",
+        type=int,
+        default=int(getenv("SESSION_DURATION") or 0),
+        help="session lifetime in seconds (defaults to SESSION_DURATION)",
+    )
+    args = parser.parse_args()
+
+    UserSession.load_from_file()
+    records, reclaimed = UserSession.prune(args.duration)
+
+    print(
+        "{} expired session(s) removed, {} bytes reclaimed".format(
+            records, reclaimed
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
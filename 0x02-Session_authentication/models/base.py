@@ -3,7 +3,7 @@
 """
 from datetime import datetime
 from typing import TypeVar, List, Iterable
-from os import path
+from os import path, remove, replace
 import json
 import uuid
 
@@ -71,15 +71,26 @@ class Base:
 
     @classmethod
     def save_to_file(cls):
-        """Save all objects to file"""
+        """Save all objects to file
+
+        The objects are written to a temporary file which then atomically
+        replaces the store, so a crash never leaves a truncated file behind.
+        """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
         objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
+        for obj_id, obj in list(DATA[s_class].items()):
             objs_json[obj_id] = obj.to_json(True)
 
-        with open(file_path, "w") as f:
-            json.dump(objs_json, f)
+        tmp_path = "{}.{}.tmp".format(file_path, uuid.uuid4().hex)
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(objs_json, f)
+            replace(tmp_path, file_path)
+        except BaseException:
+            if path.exists(tmp_path):
+                remove(tmp_path)
+            raise
 
     def save(self):
         """Save current object"""
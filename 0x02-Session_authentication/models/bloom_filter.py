@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""BloomFilter module"""
+
+import hashlib
+import threading
+from math import ceil, exp, log
+from typing import Iterator
+
+
+class BloomFilter:
+    """Counting Bloom filter of strings
+
+    A miss means the item was never added (or was removed), a hit may be a
+    false positive. Each slot is an 8 bits counter so items can be removed;
+    a saturated counter is never decremented again.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.01):
+        """Initialize a new BloomFilter
+
+        Args:
+            capacity (int, optional): Number of items the filter is sized
+                for. Defaults to 100000.
+            error_rate (float, optional): False positive rate when the filter
+                holds capacity items. Defaults to 0.01.
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = ceil(-capacity * log(error_rate) / log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * log(2)))
+        self.count = 0
+        self.checks = 0
+        self.rejections = 0
+        self._counters = bytearray(self.size)
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str) -> Iterator[int]:
+        """Slots of an item, computed by double hashing"""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        """Add an item to the filter"""
+        with self._lock:
+            for i in self._positions(item):
+                if self._counters[i] < 255:
+                    self._counters[i] += 1
+            self.count += 1
+
+    def remove(self, item: str):
+        """Remove an item previously added to the filter"""
+        with self._lock:
+            for i in self._positions(item):
+                if 0 < self._counters[i] < 255:
+                    self._counters[i] -= 1
+            self.count = max(self.count - 1, 0)
+
+    def clear(self):
+        """Remove all the items from the filter"""
+        with self._lock:
+            self._counters = bytearray(self.size)
+            self.count = 0
+
+    def __contains__(self, item: str) -> bool:
+        """Check if an item may be in the filter"""
+        counters = self._counters
+        return all(counters[i] for i in self._positions(item))
+
+    def might_contain(self, item: str) -> bool:
+        """Check if an item may be in the filter and count the rejections.
+
+        Args:
+            item (str): Item to check.
+
+        Returns:
+            bool: False if the item is definitely not in the filter.
+        """
+        found = item in self
+        with self._lock:
+            self.checks += 1
+            if not found:
+                self.rejections += 1
+        return found
+
+    def false_positive_rate(self) -> float:
+        """Estimated false positive rate for the current number of items"""
+        return (1 - exp(-self.hash_count * self.count / self.size)) ** (
+            self.hash_count
+        )
+
+    def metrics(self) -> dict:
+        """Metrics of the filter"""
+        return {
+            "items": self.count,
+            "capacity": self.capacity,
+            "false_positive_rate": self.false_positive_rate(),
+            "checks": self.checks,
+            "rejections": self.rejections,
+        }
@@ -2,13 +2,19 @@
 """ User module
 """
 import hashlib
-from models.base import Base
+from models.base import DATA, Base
+from models.bloom_filter import BloomFilter
 
 
 class User(Base):
     """ User class
     """
 
+    # Emails of the saved users. Removed users are only dropped when the
+    # filter is rebuilt, which happens once they make half of the filter.
+    email_filter = BloomFilter()
+    _removed_emails = 0
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
@@ -18,6 +24,58 @@ class User(Base):
         self.first_name = kwargs.get('first_name')
         self.last_name = kwargs.get('last_name')
 
+    @classmethod
+    def load_from_file(cls):
+        """ Load all users from file and rebuild the email filter
+        """
+        super().load_from_file()
+        cls._rebuild_email_filter()
+
+    @classmethod
+    def _rebuild_email_filter(cls):
+        """ Fill the email filter with the emails of the current users
+        """
+        users = list(DATA.get(cls.__name__, {}).values())
+        capacity = User.email_filter.capacity
+        while capacity < 2 * len(users):
+            capacity *= 2
+
+        email_filter = BloomFilter(capacity)
+        for user in users:
+            if user.email is not None:
+                email_filter.add(user.email)
+
+        email_filter.checks = User.email_filter.checks
+        email_filter.rejections = User.email_filter.rejections
+        User.email_filter = email_filter
+        User._removed_emails = 0
+
+    @classmethod
+    def email_may_exist(cls, email: str) -> bool:
+        """ Check the email filter before searching a user by email.
+        False means no user has this email.
+        """
+        return User.email_filter.might_contain(email)
+
+    def save(self):
+        """ Save current user and add its email to the filter, unless it
+        holds it already
+        """
+        if self.email is not None and self.email not in User.email_filter:
+            User.email_filter.add(self.email)
+        super().save()
+        if User.email_filter.count > User.email_filter.capacity:
+            User._rebuild_email_filter()
+
+    def remove(self):
+        """ Remove current user, its email stays in the filter until the
+        next rebuild
+        """
+        super().remove()
+        User._removed_emails += 1
+        if User._removed_emails * 2 > User.email_filter.count:
+            User._rebuild_email_filter()
+
     @property
     def password(self) -> str:
         """ Getter of the password
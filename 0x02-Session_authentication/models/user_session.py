@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 """UserSession module"""
 
-from models.base import Base
+from datetime import datetime, timedelta
+from os import path
+from typing import Iterable, Tuple, TypeVar
+
+from models.base import DATA, Base
 
 
 class UserSession(Base):
@@ -13,3 +17,86 @@ class UserSession(Base):
         super().__init__(*args, **kwargs)
         self.user_id = kwargs.get("user_id")
         self.session_id = kwargs.get("session_id")
+
+    @classmethod
+    def load_from_file(cls):
+        """Load all UserSessions from file, keyed by their session id.
+
+        Older UserSessions, stored under a random id, take their session id
+        as id.
+        """
+        super().load_from_file()
+        s_class = cls.__name__
+        for obj_id, user_session in list(DATA[s_class].items()):
+            if obj_id != user_session.session_id:
+                del DATA[s_class][obj_id]
+                user_session.id = user_session.session_id
+                DATA[s_class][user_session.id] = user_session
+
+    @classmethod
+    def get_by_session_id(cls, session_id: str) -> TypeVar("UserSession"):
+        """Get the UserSession of a session id, None if there is none.
+
+        UserSessions are stored under their session id.
+        """
+        return cls.get(session_id)
+
+    @classmethod
+    def remove_sessions(cls, session_ids: Iterable[str]) -> int:
+        """Remove the UserSessions of several session ids and rewrite the
+        store once.
+
+        Args:
+            session_ids (Iterable[str]): The session ids.
+
+        Returns:
+            int: The number of UserSessions removed.
+        """
+        s_class = cls.__name__
+        removed = 0
+        for session_id in session_ids:
+            user_session = cls.get_by_session_id(session_id)
+            if user_session is not None:
+                DATA[s_class].pop(user_session.id, None)
+                removed += 1
+
+        if removed:
+            cls.save_to_file()
+
+        return removed
+
+    @classmethod
+    def prune(cls, session_duration: int) -> Tuple[int, int]:
+        """Remove the sessions unused for more than session_duration and
+        rewrite the store.
+
+        Args:
+            session_duration (int): Lifetime of a session in seconds. Sessions
+                never expire if it is 0 or less.
+
+        Returns:
+            Tuple[int, int]: The number of sessions removed and the number of
+                bytes reclaimed on disk.
+        """
+        s_class = cls.__name__
+        if session_duration <= 0 or not DATA.get(s_class):
+            return 0, 0
+
+        oldest = datetime.utcnow() - timedelta(seconds=session_duration)
+        expired = [
+            obj_id
+            for obj_id, obj in list(DATA[s_class].items())
+            if obj.updated_at < oldest
+        ]
+
+        if len(expired) == 0:
+            return 0, 0
+
+        file_path = ".db_{}.json".format(s_class)
+        size_before = path.getsize(file_path) if path.exists(file_path) else 0
+
+        for obj_id in expired:
+            DATA[s_class].pop(obj_id, None)
+        cls.save_to_file()
+
+        return len(expired), max(size_before - path.getsize(file_path), 0)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""admission module"""
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+
+class Overloaded(Exception):
+    """Raised when work is shed because the server is overloaded."""
+
+    def __init__(self, retry_after: float):
+        """Initialize a new Overloaded exception.
+
+        Args:
+            retry_after (float): Seconds the client should wait before
+                retrying.
+        """
+        super().__init__("Server overloaded")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded wait queue.
+
+    At most `limit` callers run at once, up to `max_queue` more wait for a
+    slot during `queue_timeout` seconds, and the others are rejected at once.
+    The limit adapts to the observed latency of the work: it shrinks when the
+    latency rises above `tolerance` times the lowest latency seen, which
+    happens once the CPU is oversubscribed, and grows back otherwise.
+    """
+
+    def __init__(
+        self,
+        limit: int = None,
+        max_limit: int = None,
+        max_queue: int = 64,
+        queue_timeout: float = 5.0,
+        tolerance: float = 1.5,
+    ):
+        """Initialize a new AdmissionController.
+
+        Args:
+            limit (int, optional): Initial concurrency limit. Defaults to the
+                number of cores.
+            max_limit (int, optional): Highest concurrency limit. Defaults to
+                twice the number of cores.
+            max_queue (int, optional): Maximum number of waiting callers.
+                Defaults to 64.
+            queue_timeout (float, optional): Seconds a caller may wait for a
+                slot. Defaults to 5.0.
+            tolerance (float, optional): Latency increase tolerated before
+                shrinking the limit. Defaults to 1.5.
+        """
+        cores = os.cpu_count() or 1
+        self.max_limit = max_limit or 2 * cores
+        self.limit = float(min(limit or cores, self.max_limit))
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.latency = None
+        self.min_latency = None
+        self._condition = threading.Condition()
+
+    def _retry_after(self) -> float:
+        """Estimate the seconds needed to drain the queue"""
+        latency = self.latency or 1.0
+        return max(1.0, (self.waiting + 1) * latency / self.limit)
+
+    def _reject(self):
+        """Count and raise a rejection"""
+        self.rejected += 1
+        raise Overloaded(self._retry_after())
+
+    def _enter(self) -> bool:
+        """Take a slot if one is free, with the condition held"""
+        if self.in_flight >= int(self.limit):
+            return False
+
+        self.in_flight += 1
+        return True
+
+    def _enter_or_queue(self) -> bool:
+        """Take a slot if one is free, else join the queue, with the
+        condition held.
+
+        Raises:
+            Overloaded: If the queue is full.
+
+        Returns:
+            bool: True if a slot was taken, False if the caller must wait.
+        """
+        if self._enter():
+            return True
+
+        if self.waiting >= self.max_queue:
+            self._reject()
+
+        self.waiting += 1
+        return False
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """Run the body of the with statement once a slot is free.
+
+        Raises:
+            Overloaded: If the queue is full or no slot was freed in time.
+        """
+        with self._condition:
+            if not self._enter_or_queue():
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while not self._enter():
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._reject()
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - start)
+
+    def _release(self, latency: float):
+        """Free a slot and adapt the limit to the latency of the work.
+
+        Args:
+            latency (float): Seconds the work took.
+        """
+        with self._condition:
+            self.in_flight -= 1
+
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency = 0.8 * self.latency + 0.2 * latency
+            if self.min_latency is None or latency < self.min_latency:
+                self.min_latency = latency
+
+            if self.latency > self.tolerance * self.min_latency:
+                self.limit = max(1.0, self.limit * 0.9)
+            else:
+                self.limit = min(
+                    float(self.max_limit), self.limit + 1 / self.limit
+                )
+
+            self._condition.notify()
+
+    def metrics(self) -> dict:
+        """Get the metrics of the controller.
+
+        Returns:
+            dict: Current limit, in flight, waiting and rejected callers, and
+                average latency.
+        """
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "latency": self.latency,
+        }
+
+
+class AsyncAdmissionController:
+    """AdmissionController for coroutines.
+
+    Callers wait for a slot on the event loop instead of blocking a thread.
+    The limit, queue and rejections are the ones of the wrapped controller.
+    """
+
+    def __init__(self, controller: AdmissionController):
+        """Initialize a new AsyncAdmissionController.
+
+        Args:
+            controller (AdmissionController): The wrapped controller.
+        """
+        self.controller = controller
+        self._released = asyncio.Condition()
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Run the body of the async with statement once a slot is free.
+
+        Raises:
+            Overloaded: If the queue is full or no slot was freed in time.
+        """
+        controller = self.controller
+        with controller._condition:
+            entered = controller._enter_or_queue()
+
+        if not entered:
+            deadline = time.monotonic() + controller.queue_timeout
+            try:
+                async with self._released:
+                    while True:
+                        with controller._condition:
+                            if controller._enter():
+                                break
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                controller._reject()
+                        try:
+                            await asyncio.wait_for(
+                                self._released.wait(), remaining
+                            )
+                        except asyncio.TimeoutError:
+                            pass
+            finally:
+                with controller._condition:
+                    controller.waiting -= 1
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            controller._release(time.monotonic() - start)
+            async with self._released:
+                self._released.notify()
+
+    def metrics(self) -> dict:
+        """Get the metrics of the wrapped controller.
+
+        Returns:
+            dict: Current limit, in flight, waiting and rejected callers, and
+                average latency.
+        """
+        return self.controller.metrics()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Create the admission controller of the password hashing work.
+
+    Configured through environment variables.
+
+    ```Bash
+    HASH_CONCURRENCY -> Initial concurrency limit (Defaults to the cores)
+    HASH_MAX_CONCURRENCY -> Highest concurrency limit (Defaults to 2 * cores)
+    HASH_QUEUE_SIZE -> Maximum number of waiting requests (Defaults to 64)
+    HASH_QUEUE_TIMEOUT -> Seconds a request may wait (Defaults to 5)
+    ```
+
+    Returns:
+        AdmissionController: The admission controller.
+    """
+    return AdmissionController(
+        limit=int(os.getenv("HASH_CONCURRENCY", 0)) or None,
+        max_limit=int(os.getenv("HASH_MAX_CONCURRENCY", 0)) or None,
+        max_queue=int(os.getenv("HASH_QUEUE_SIZE", 64)),
+        queue_timeout=float(os.getenv("HASH_QUEUE_TIMEOUT", 5)),
+    )
@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
 """flask app module"""
 
+from math import ceil
+
 from flask import Flask, Response
 from flask import abort, jsonify, redirect, request, url_for
 
+from admission import Overloaded
 from auth import Auth
+from rate_limit import RateLimitExceeded, get_login_rate_limiter
 
 app = Flask(__name__)
 
 AUTH = Auth()
+LOGIN_RATE_LIMITER = get_login_rate_limiter()
+
+
+@app.teardown_appcontext
+def release_db_session(exception: BaseException = None) -> None:
+    """Release the database session of the request thread."""
+    AUTH.release_db_session()
 
 
 @app.route("/", methods=["GET"])
@@ -45,10 +56,15 @@ def login() -> Response:
     email = request.form.get("email")
     password = request.form.get("password")
 
-    if AUTH.valid_login(email, password) is False:
-        abort(401)
+    if LOGIN_RATE_LIMITER is not None:
+        LOGIN_RATE_LIMITER.check_allowed(request.remote_addr, email)
+
+    session_id = AUTH.login(email, password)
 
-    session_id = AUTH.create_session(email)
+    if session_id is None:
+        if LOGIN_RATE_LIMITER is not None:
+            LOGIN_RATE_LIMITER.count_failure(request.remote_addr, email)
+        abort(401)
 
     response = jsonify({"email": email, "message": "logged in"})
     response.set_cookie("session_id", session_id)
@@ -70,7 +86,7 @@ def logout() -> Response:
     if user is None:
         abort(403)
 
-    AUTH.destroy_session(user.id)
+    AUTH.destroy_session(user.id, session_id)
 
     return redirect(url_for("home"), code=303)
 
@@ -131,5 +147,42 @@ def update_password() -> Response:
     return jsonify({"email": email, "message": "Password updated"})
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics() -> Response:
+    """Get the metrics of the service, including the timings of the SQL
+    statements.
+
+    Returns:
+        Response: A json response.
+    """
+    return jsonify(AUTH.metrics())
+
+
+@app.errorhandler(RateLimitExceeded)
+def too_many_requests(error: RateLimitExceeded) -> Response:
+    """Reject a rate limited client.
+
+    Returns:
+        Response: A json response with 429 HTTP status.
+    """
+    response = jsonify({"message": "too many requests"})
+    response.headers["Retry-After"] = str(ceil(error.retry_after))
+
+    return response, 429
+
+
+@app.errorhandler(Overloaded)
+def overloaded(error: Overloaded) -> Response:
+    """Shed a request the server has no capacity for.
+
+    Returns:
+        Response: A json response with 503 HTTP status.
+    """
+    response = jsonify({"message": "server overloaded"})
+    response.headers["Retry-After"] = str(ceil(error.retry_after))
+
+    return response, 503
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""ASGI app module
+
+Serves the routes of app.py from an event loop, so waiting requests hold no
+thread. Queries and password hashes run on bounded worker pools. Any ASGI
+server runs it:
+
+```Bash
+uvicorn async_app:app --port 5000
+```
+"""
+
+import json
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from math import ceil
+from typing import Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import parse_qsl
+
+from admission import Overloaded
+from async_auth import AsyncAuth
+from rate_limit import RateLimitExceeded, get_login_rate_limiter
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 64 * 1024
+
+AUTH = AsyncAuth()
+LOGIN_RATE_LIMITER = get_login_rate_limiter()
+
+
+class HTTPError(Exception):
+    """Ends a request with an error status, like flask.abort."""
+
+    def __init__(self, status: int):
+        """Initialize a new HTTPError.
+
+        Args:
+            status (int): HTTP status of the response.
+        """
+        super().__init__(status)
+        self.status = status
+
+
+class Request:
+    """Request received by the app."""
+
+    def __init__(self, scope: dict, body: bytes):
+        """Initialize a new Request.
+
+        Args:
+            scope (dict): ASGI scope of the request.
+            body (bytes): Body of the request.
+        """
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.remote_addr = (scope.get("client") or (None,))[0]
+
+        headers = {}
+        for name, value in scope["headers"]:
+            headers[name.decode("latin-1")] = value.decode("latin-1")
+
+        self.cookies = {}
+        cookie = SimpleCookie()
+        cookie.load(headers.get("cookie", ""))
+        for name, morsel in cookie.items():
+            self.cookies[name] = morsel.value
+
+        self.form = {}
+        content_type = headers.get("content-type", "")
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            self.form = dict(parse_qsl(body.decode()))
+
+
+class Response:
+    """Response sent by the app."""
+
+    def __init__(self, body: dict, status: int = 200, headers: dict = None):
+        """Initialize a new JSON Response.
+
+        Args:
+            body (dict): Body of the response, sent as json.
+            status (int, optional): HTTP status. Defaults to 200.
+            headers (dict, optional): Extra headers. Defaults to None.
+        """
+        self.body = json.dumps(body).encode()
+        self.status = status
+        self.headers: List[Tuple[bytes, bytes]] = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(self.body)).encode()),
+        ]
+        for name, value in (headers or {}).items():
+            self.headers.append((name.encode(), value.encode()))
+
+    def set_cookie(self, name: str, value: str) -> None:
+        """Set a cookie on the client.
+
+        Args:
+            name (str): Name of the cookie.
+            value (str): Value of the cookie.
+        """
+        self.headers.append(
+            (b"set-cookie", "{}={}; Path=/".format(name, value).encode())
+        )
+
+    async def send(self, send: Callable[[dict], Awaitable[None]]) -> None:
+        """Send the response through the ASGI send callable."""
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status,
+                "headers": self.headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": self.body})
+
+
+def redirect(location: str, status: int = 303) -> Response:
+    """Redirect the client.
+
+    Args:
+        location (str): Location to redirect to.
+        status (int, optional): HTTP status. Defaults to 303.
+
+    Returns:
+        Response: The redirect response.
+    """
+    return Response({}, status, {"location": location})
+
+
+async def home(request: Request) -> Response:
+    """Home route"""
+    return Response({"message": "Bienvenue"})
+
+
+async def users(request: Request) -> Response:
+    """Create a new user if they aren't registered yet.
+
+    Returns:
+        Response: A json response.
+    """
+    email = request.form.get("email")
+    password = request.form.get("password")
+
+    if email is None or password is None:
+        raise HTTPError(400)
+
+    try:
+        await AUTH.register_user(email, password)
+    except ValueError:
+        return Response({"message": "email already registered"}, 400)
+
+    return Response({"email": email, "message": "user created"})
+
+
+async def login(request: Request) -> Response:
+    """Login a user.
+
+    Returns:
+        Response: A json response.
+    """
+    email = request.form.get("email")
+    password = request.form.get("password")
+
+    if LOGIN_RATE_LIMITER is not None:
+        LOGIN_RATE_LIMITER.check_allowed(request.remote_addr, email)
+
+    session_id = None
+    if password is not None:
+        session_id = await AUTH.login(email, password)
+
+    if session_id is None:
+        if LOGIN_RATE_LIMITER is not None:
+            LOGIN_RATE_LIMITER.count_failure(request.remote_addr, email)
+        raise HTTPError(401)
+
+    response = Response({"email": email, "message": "logged in"})
+    response.set_cookie("session_id", session_id)
+
+    return response
+
+
+async def logout(request: Request) -> Response:
+    """Logout a logged in user.
+
+    Returns:
+        Response: redirect to / or abort with 403 HTTP status.
+    """
+    session_id = request.cookies.get("session_id")
+
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if user is None:
+        raise HTTPError(403)
+
+    await AUTH.destroy_session(user.id, session_id)
+
+    return redirect("/")
+
+
+async def profile(request: Request) -> Response:
+    """Get user profile.
+
+    Returns:
+        Response: User email as json, else abort with 403 HTTP status.
+    """
+    session_id = request.cookies.get("session_id")
+
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if user is None:
+        raise HTTPError(403)
+
+    return Response({"email": user.email})
+
+
+async def get_reset_password_token(request: Request) -> Response:
+    """Get password reset token.
+
+    Returns:
+        Response: A json response.
+    """
+    email = request.form.get("email")
+
+    try:
+        reset_token = await AUTH.get_reset_password_token(email)
+    except ValueError:
+        raise HTTPError(403)
+
+    return Response({"email": email, "reset_token": reset_token})
+
+
+async def update_password(request: Request) -> Response:
+    """Update a user's password.
+
+    Returns:
+        Response: A json response.
+    """
+    email = request.form.get("email")
+    reset_token = request.form.get("reset_token")
+    new_password = request.form.get("new_password")
+
+    if new_password is None or reset_token is None:
+        raise HTTPError(403)
+
+    try:
+        await AUTH.update_password(reset_token, new_password)
+    except ValueError:
+        raise HTTPError(403)
+
+    return Response({"email": email, "message": "Password updated"})
+
+
+async def metrics(request: Request) -> Response:
+    """Get the metrics of the service, including the timings of the SQL
+    statements.
+
+    Returns:
+        Response: A json response.
+    """
+    return Response(AUTH.metrics())
+
+
+ROUTES: Dict[str, Dict[str, Callable[[Request], Awaitable[Response]]]] = {
+    "/": {"GET": home},
+    "/users": {"POST": users},
+    "/sessions": {"POST": login, "DELETE": logout},
+    "/profile": {"GET": profile},
+    "/reset_password": {
+        "POST": get_reset_password_token,
+        "PUT": update_password,
+    },
+    "/metrics": {"GET": metrics},
+}
+
+
+def error_response(status: int, headers: dict = None) -> Response:
+    """Build the json response of an error status.
+
+    Args:
+        status (int): HTTP status.
+        headers (dict, optional): Extra headers. Defaults to None.
+
+    Returns:
+        Response: A json response.
+    """
+    return Response(
+        {"error": HTTPStatus(status).phrase.lower()}, status, headers
+    )
+
+
+async def dispatch(request: Request) -> Response:
+    """Run the route of a request and turn errors into responses.
+
+    Args:
+        request (Request): The request.
+
+    Returns:
+        Response: The response of the route.
+    """
+    methods = ROUTES.get(request.path)
+    if methods is None:
+        return error_response(404)
+
+    handler = methods.get(request.method)
+    if handler is None:
+        return error_response(405, {"allow": ", ".join(methods)})
+
+    try:
+        return await handler(request)
+    except HTTPError as error:
+        return error_response(error.status)
+    except RateLimitExceeded as error:
+        return Response(
+            {"message": "too many requests"},
+            429,
+            {"retry-after": str(ceil(error.retry_after))},
+        )
+    except Overloaded as error:
+        return Response(
+            {"message": "server overloaded"},
+            503,
+            {"retry-after": str(ceil(error.retry_after))},
+        )
+
+
+async def read_body(receive: Callable[[], Awaitable[dict]]) -> bytes:
+    """Read the body of a request.
+
+    Raises:
+        HTTPError: If the body is larger than MAX_BODY_SIZE.
+
+    Returns:
+        bytes: The body.
+    """
+    chunks = []
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            raise HTTPError(413)
+        chunks.append(chunk)
+        more_body = message.get("more_body", False)
+
+    return b"".join(chunks)
+
+
+async def lifespan(receive, send) -> None:
+    """Handle the startup and shutdown of the server."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            AUTH.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope: dict, receive, send) -> None:
+    """ASGI entry point.
+
+    Args:
+        scope (dict): ASGI scope of the connection.
+        receive (Callable): Receives the messages of the client.
+        send (Callable): Sends messages to the client.
+    """
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    if scope["type"] != "http":
+        return
+
+    try:
+        body = await read_body(receive)
+    except HTTPError as error:
+        return await error_response(error.status).send(send)
+
+    response = await dispatch(Request(scope, body))
+    await response.send(send)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("async_app:app", host="0.0.0.0", port=5000)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""async auth module"""
+
+import asyncio
+from concurrent.futures import Future
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import NoResultFound
+
+# Local
+from admission import (
+    AsyncAdmissionController,
+    Overloaded,
+    get_admission_controller,
+)
+from async_db import AsyncDB
+from auth import AuthBase, _generate_uuid, _token_digest, _utcnow
+from session_cache import SessionUser
+from user import User
+
+
+class AsyncAuth(AuthBase):
+    """Async version of the Auth class.
+
+    Queries run through AsyncDB and hashes on the hash executor, awaited
+    without holding a thread. Hashes wait for a slot of the admission
+    controller on the event loop, so the limit, queue and Retry-After are
+    the ones of Auth.
+    """
+
+    def __init__(self):
+        """Initialize a new AsyncAuth instance"""
+        super().__init__(
+            AsyncDB(), AsyncAdmissionController(get_admission_controller())
+        )
+
+    async def _await_hash(self, future: Future):
+        """Await a hash submitted to the hash executor.
+
+        Args:
+            future (Future): Future of the hash.
+
+        Raises:
+            Overloaded: If the hash didn't complete within the timeout.
+        """
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), self._hasher.timeout
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise Overloaded(self._hasher.timeout)
+
+    async def _hash_password(self, password: str) -> bytes:
+        """Hash a password on the hash executor once the admission
+        controller lets it run.
+
+        Args:
+            password (str): Password to hash.
+
+        Raises:
+            Overloaded: If too much hashing work is queued, or the hash
+                timed out.
+
+        Returns:
+            bytes: Hashed password.
+        """
+        async with self._admission.admit():
+            return await self._await_hash(self._hasher.submit_hash(password))
+
+    async def _check_password(
+        self, password: str, hashed_password: bytes
+    ) -> bool:
+        """Check a password on the hash executor once the admission
+        controller lets it run.
+
+        Args:
+            password (str): Password to check.
+            hashed_password (bytes): Hashed password.
+
+        Raises:
+            Overloaded: If too much hashing work is queued, or the check
+                timed out.
+
+        Returns:
+            bool: True if the password matches, else False.
+        """
+        async with self._admission.admit():
+            return await self._await_hash(
+                self._hasher.submit_check(password, hashed_password)
+            )
+
+    async def register_user(self, email: str, password: str) -> User:
+        """Create a new user if they don't exist.
+
+        Args:
+            email (str): The user's email.
+            password (str): The user's password.
+
+        Raises:
+            ValueError: If a user with the given email already exists.
+
+        Returns:
+            User: The newly created user.
+        """
+        try:
+            if await self._db.find_user_by(email=email):
+                raise ValueError(f"User {email} already exists")
+        except NoResultFound:
+            pass
+
+        hashed_password = await self._hash_password(password)
+
+        try:
+            return await self._db.add_user(email, hashed_password)
+        except IntegrityError:
+            raise ValueError(f"User {email} already exists")
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """Validate a login.
+
+        Args:
+            email (str): The user's email.
+            password (str): The user's password.
+
+        Returns:
+            bool: True if the user exists and password is valid, else False.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return False
+
+        return await self._check_password(password, user.hashed_password)
+
+    async def login(self, email: str, password: str) -> Optional[str]:
+        """Validate a login and create a session for the user.
+
+        Costs one lookup, one password check and one session write. The
+        write only happens if the password is still the one checked.
+
+        Args:
+            email (str): The user's email.
+            password (str): The user's password.
+
+        Returns:
+            Optional[str]: The new session id, None if the login is invalid.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return None
+
+        if not await self._check_password(password, user.hashed_password):
+            return None
+
+        session_id = _generate_uuid()
+        created = await self._db.add_session(
+            user.id,
+            session_id,
+            self._expires_at(),
+            {"hashed_password": user.hashed_password},
+        )
+        await self._purge_expired_periodically()
+
+        return session_id if created else None
+
+    async def create_session(self, email: str) -> str:
+        """Create a new session for a user.
+
+        The other sessions of the user stay valid.
+
+        Args:
+            email (str): The user's email.
+
+        Returns:
+            str: The user's session id.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return None
+
+        session_id = _generate_uuid()
+        await self._db.add_session(user.id, session_id, self._expires_at())
+        await self._purge_expired_periodically()
+
+        return session_id
+
+    async def get_user_from_session_id(
+        self, session_id: str
+    ) -> Optional[SessionUser]:
+        """Get a user from the provided session id.
+
+        Served from the session cache when possible.
+
+        Args:
+            session_id (str): The user's session id.
+
+        Returns:
+            Optional[SessionUser]: user with the given session id or None if
+                not found or expired
+        """
+        if session_id is None:
+            return None
+
+        user, version = self._cached_user(session_id)
+        if user is not None:
+            return user
+
+        now = _utcnow()
+        try:
+            user, expires_at = await self._db.find_session(session_id, now)
+        except NoResultFound:
+            return None
+
+        return self._cache_user(session_id, user, expires_at, version, now)
+
+    async def destroy_session(
+        self, user_id: int, session_id: str = None
+    ) -> None:
+        """Destroy a session of a user, or all of them.
+
+        Args:
+            user_id (int): The user's id
+            session_id (str, optional): The session to destroy. Defaults to
+                None, which destroys every session of the user.
+        """
+        try:
+            if session_id is None:
+                await self._db.delete_user_sessions(user_id)
+            else:
+                await self._db.delete_session(session_id)
+        finally:
+            self._invalidate(user_id, session_id)
+
+    async def purge_expired_sessions(self) -> int:
+        """Delete the expired sessions.
+
+        Returns:
+            int: The number of sessions deleted.
+        """
+        return await self._db.purge_expired_sessions(_utcnow())
+
+    async def purge_expired_reset_tokens(self) -> int:
+        """Delete the expired reset tokens.
+
+        Returns:
+            int: The number of tokens deleted.
+        """
+        return await self._db.purge_expired_reset_tokens(_utcnow())
+
+    async def _purge_expired_periodically(self) -> None:
+        """Purge the expired sessions and reset tokens once per
+        SESSION_PURGE_INTERVAL"""
+        if self._purge_due():
+            await self.purge_expired_sessions()
+            await self.purge_expired_reset_tokens()
+
+    async def get_reset_password_token(self, email: str) -> str:
+        """Generate a reset token and save its digest in db.
+
+        The token replaces the previous ones of the user, and expires after
+        RESET_TOKEN_DURATION seconds.
+
+        Args:
+            email (str): The user's email.
+
+        Raises:
+            ValueError: If no user is found with given email.
+        Returns:
+            str: The reset token.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            raise ValueError
+
+        reset_token, token_hash, expires_at = self._new_reset_token()
+        await self._db.add_reset_token(user.id, token_hash, expires_at)
+        await self._purge_expired_periodically()
+
+        return reset_token
+
+    async def update_password(self, reset_token: str, password: str) -> None:
+        """Update a user's password, spending the reset token.
+
+        Args:
+            reset_token (str): The reset token of the user.
+            password (str): The new password.
+
+        Raises:
+            ValueError: If the reset token is unknown, expired or spent.
+        """
+        if reset_token is None:
+            raise ValueError
+
+        token_hash = _token_digest(reset_token)
+        try:
+            user = await self._db.find_user_by_reset_token(
+                token_hash, _utcnow()
+            )
+        except NoResultFound:
+            raise ValueError
+
+        hashed_password = await self._hash_password(password)
+
+        try:
+            if not await self._db.reset_password(
+                user.id, token_hash, hashed_password
+            ):
+                raise ValueError
+        finally:
+            self._session_cache.invalidate_user(user.id)
+
+    def close(self) -> None:
+        """Stop the database and hashing workers."""
+        self._db.close()
+        self._hasher.shutdown()
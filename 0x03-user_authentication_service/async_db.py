@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""async DB module"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Callable, Optional, Tuple
+
+from db import DB
+from query_stats import QueryStats
+from user import User
+
+
+class AsyncDB:
+    """Async facade of the DB class.
+
+    Each call runs on a small pool of threads sized to the connection pool,
+    so a coroutine waiting on SQLite holds no thread of its own. The session
+    of the worker thread is released after every call.
+
+    Configured through environment variables.
+
+    ```Bash
+    DB_WORKERS -> Threads running the queries (Defaults to DB_POOL_SIZE)
+    ```
+    """
+
+    def __init__(self, db: DB = None) -> None:
+        """Initialize a new AsyncDB instance
+
+        Args:
+            db (DB, optional): Database to run the queries on. Defaults to a
+                new DB.
+        """
+        self._db = db or DB()
+        workers = int(os.getenv("DB_WORKERS", 0)) or self._db.pool_size
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="db")
+
+    @property
+    def query_stats(self) -> Optional[QueryStats]:
+        """Statement recorder of the database, None if disabled"""
+        return self._db.query_stats
+
+    def _call(self, method: Callable, *args, **kwargs):
+        """Run a method of the DB, then release the thread session"""
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._db.remove_session()
+
+    async def _run(self, method: Callable, *args, **kwargs):
+        """Run a method of the DB on the worker threads"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(self._call, method, *args, **kwargs)
+        )
+
+    async def add_user(self, email: str, hashed_password: str) -> User:
+        """Creates a new user and stores the user in the database.
+
+        Args:
+            email (str): The user email.
+            hashed_password (str): The user hashed password.
+
+        Raises:
+            IntegrityError: If a user with the same email already exists.
+
+        Returns:
+            User: The newly created user.
+        """
+        return await self._run(self._db.add_user, email, hashed_password)
+
+    async def find_user_by(self, **kwargs) -> User:
+        """Find a user by the kwargs provided.
+
+        Raises:
+            NoResultFound: If no user was found.
+            InvalidRequestError: If the a key in kwargs is not a valid column.
+
+        Returns:
+            User: The first user found.
+        """
+        return await self._run(self._db.find_user_by, **kwargs)
+
+    async def update_user(self, user_id: int, **kwargs) -> None:
+        """Update a user with the given user id.
+
+        Args:
+            user_id (int): The id of the user to update.
+
+        Raises:
+            ValueError: If a given argument doesn't correspond to a user
+                attribute.
+        """
+        return await self._run(self._db.update_user, user_id, **kwargs)
+
+    async def add_session(
+        self,
+        user_id: int,
+        session_id: str,
+        expires_at: datetime,
+        expected: dict = None,
+    ) -> bool:
+        """Create a session for a user.
+
+        Args:
+            user_id (int): The id of the user.
+            session_id (str): The session id.
+            expires_at (datetime): End of validity of the session, in UTC.
+            expected (dict, optional): Values the user columns must hold for
+                the session to be created. Defaults to None.
+
+        Returns:
+            bool: True if the session was created, False if no user matched.
+        """
+        return await self._run(
+            self._db.add_session, user_id, session_id, expires_at, expected
+        )
+
+    async def find_session(
+        self, session_id: str, now: datetime
+    ) -> Tuple[User, datetime]:
+        """Find the user of a session which hasn't expired.
+
+        Args:
+            session_id (str): The session id.
+            now (datetime): Current time, in UTC.
+
+        Raises:
+            NoResultFound: If the session doesn't exist or expired.
+
+        Returns:
+            Tuple[User, datetime]: The user and the end of validity of the
+                session.
+        """
+        return await self._run(self._db.find_session, session_id, now)
+
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete a session.
+
+        Args:
+            session_id (str): The session id.
+
+        Returns:
+            bool: True if the session existed, else False.
+        """
+        return await self._run(self._db.delete_session, session_id)
+
+    async def delete_user_sessions(self, user_id: int) -> int:
+        """Delete every session of a user.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            int: The number of sessions deleted.
+        """
+        return await self._run(self._db.delete_user_sessions, user_id)
+
+    async def purge_expired_sessions(self, now: datetime) -> int:
+        """Delete the expired sessions.
+
+        Args:
+            now (datetime): Current time, in UTC.
+
+        Returns:
+            int: The number of sessions deleted.
+        """
+        return await self._run(self._db.purge_expired_sessions, now)
+
+    async def add_reset_token(
+        self, user_id: int, token_hash: str, expires_at: datetime
+    ) -> None:
+        """Store the reset token of a user, replacing their previous ones.
+
+        Args:
+            user_id (int): The id of the user.
+            token_hash (str): Digest of the token.
+            expires_at (datetime): End of validity of the token, in UTC.
+        """
+        return await self._run(
+            self._db.add_reset_token, user_id, token_hash, expires_at
+        )
+
+    async def find_user_by_reset_token(
+        self, token_hash: str, now: datetime
+    ) -> User:
+        """Find the user of a reset token which hasn't expired.
+
+        Args:
+            token_hash (str): Digest of the token.
+            now (datetime): Current time, in UTC.
+
+        Raises:
+            NoResultFound: If the token doesn't exist or expired.
+
+        Returns:
+            User: The user.
+        """
+        return await self._run(
+            self._db.find_user_by_reset_token, token_hash, now
+        )
+
+    async def reset_password(
+        self, user_id: int, token_hash: str, hashed_password: bytes
+    ) -> bool:
+        """Spend a reset token and set the new password, in one transaction.
+
+        Args:
+            user_id (int): The id of the user.
+            token_hash (str): Digest of the token.
+            hashed_password (bytes): The new hashed password.
+
+        Returns:
+            bool: True if the password was set, False if the token was
+                already spent.
+        """
+        return await self._run(
+            self._db.reset_password, user_id, token_hash, hashed_password
+        )
+
+    async def purge_expired_reset_tokens(self, now: datetime) -> int:
+        """Delete the expired reset tokens.
+
+        Args:
+            now (datetime): Current time, in UTC.
+
+        Returns:
+            int: The number of tokens deleted.
+        """
+        return await self._run(self._db.purge_expired_reset_tokens, now)
+
+    def close(self) -> None:
+        """Wait for the running queries and stop the worker threads."""
+        self._executor.shutdown(wait=True)
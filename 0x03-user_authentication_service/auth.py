@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
 """auth module"""
 
+import hashlib
+import os
+import time
+
 import bcrypt
 
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
+from itertools import islice
 from uuid import uuid4
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 # Local
+from admission import get_admission_controller
 from db import DB
+from hashing import get_hash_executor
+from session_cache import SessionUser, get_session_cache
 from user import User
 
 
@@ -34,12 +44,204 @@ def _generate_uuid() -> str:
     return str(uuid4())
 
 
-class Auth:
+def _token_digest(token: str) -> str:
+    """Digest of a token, as stored in the database.
+
+    Args:
+        token (str): The token.
+
+    Returns:
+        str: SHA-256 hex digest of the token.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _utcnow() -> datetime:
+    """Current time in UTC, as stored in the database.
+
+    Returns:
+        datetime: Naive UTC datetime.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class AuthBase:
+    """Logic shared by Auth and AsyncAuth.
+
+    Holds the configuration, the session cache and the token handling, so
+    the two classes only differ in how they reach the database and wait for
+    the hashes.
+
+    Configured through environment variables.
+
+    ```Bash
+    SESSION_DURATION -> Seconds a session stays valid (Defaults to 86400)
+    SESSION_PURGE_INTERVAL -> Seconds between two purges of the expired
+        sessions and reset tokens (Defaults to 3600)
+    RESET_TOKEN_DURATION -> Seconds a reset token stays valid (Defaults to
+        900)
+    ```
+    """
+
+    def __init__(self, db, admission):
+        """Initialize a new AuthBase instance
+
+        Args:
+            db (DB | AsyncDB): The database.
+            admission (AdmissionController | AsyncAdmissionController): The
+                admission controller of the hashes.
+        """
+        self._db = db
+        self._admission = admission
+        self._hasher = get_hash_executor()
+        self._session_cache = get_session_cache()
+        self._session_duration = timedelta(
+            seconds=int(os.getenv("SESSION_DURATION", 86400))
+        )
+        self._purge_interval = float(os.getenv("SESSION_PURGE_INTERVAL", 3600))
+        self._reset_token_duration = timedelta(
+            seconds=int(os.getenv("RESET_TOKEN_DURATION", 900))
+        )
+        self._purged_at = time.monotonic()
+
+    def metrics(self) -> dict:
+        """Get the metrics of the authentication service.
+
+        Returns:
+            dict: Metrics of the hashing admission, the session cache and the
+                database statements.
+        """
+        query_stats = self._db.query_stats
+        return {
+            "admission": self._admission.metrics(),
+            "session_cache": self._session_cache.metrics(),
+            "db": query_stats.metrics() if query_stats is not None else None,
+        }
+
+    def _expires_at(self) -> datetime:
+        """End of validity of a session created now, in UTC"""
+        return _utcnow() + self._session_duration
+
+    def _new_reset_token(self) -> Tuple[str, str, datetime]:
+        """Generate a reset token.
+
+        Returns:
+            Tuple[str, str, datetime]: The token, its digest as stored in the
+                database, and its end of validity in UTC.
+        """
+        reset_token = _generate_uuid()
+        return (
+            reset_token,
+            _token_digest(reset_token),
+            _utcnow() + self._reset_token_duration,
+        )
+
+    def _purge_due(self) -> bool:
+        """Check if the expired sessions and reset tokens are due for their
+        purge, once per SESSION_PURGE_INTERVAL"""
+        if time.monotonic() - self._purged_at < self._purge_interval:
+            return False
+
+        self._purged_at = time.monotonic()
+        return True
+
+    def _cached_user(
+        self, session_id: str
+    ) -> Tuple[Optional[SessionUser], int]:
+        """Get the user of a session from the session cache.
+
+        Args:
+            session_id (str): The session id.
+
+        Returns:
+            Tuple[Optional[SessionUser], int]: The cached user, None on a
+                miss, and the version of the cache to store a lookup with.
+        """
+        return (
+            self._session_cache.get(session_id),
+            self._session_cache.version,
+        )
+
+    def _cache_user(
+        self,
+        session_id: str,
+        user: User,
+        expires_at: datetime,
+        version: int,
+        now: datetime,
+    ) -> SessionUser:
+        """Cache the user of a session found in the database.
+
+        Args:
+            session_id (str): The session id.
+            user (User): The user of the session.
+            expires_at (datetime): End of validity of the session, in UTC.
+            version (int): Version of the cache before the lookup.
+            now (datetime): Time of the lookup, in UTC.
+
+        Returns:
+            SessionUser: The cached user.
+        """
+        user = SessionUser(user.id, user.email)
+        self._session_cache.put(
+            session_id, user, version, (expires_at - now).total_seconds()
+        )
+        return user
+
+    def _invalidate(self, user_id: int, session_id: str = None) -> None:
+        """Drop a destroyed session, or every session of a user, from the
+        session cache"""
+        if session_id is None:
+            self._session_cache.invalidate_user(user_id)
+        else:
+            self._session_cache.invalidate(session_id)
+
+
+class Auth(AuthBase):
     """Auth class to interact with the authentication database."""
 
     def __init__(self):
         """Initialize a new Auth instance"""
-        self._db = DB()
+        super().__init__(DB(), get_admission_controller())
+
+    def release_db_session(self) -> None:
+        """Release the database session of the current thread."""
+        self._db.remove_session()
+
+    def _hash_password(self, password: str) -> bytes:
+        """Hash a password on the hash executor once the admission
+        controller lets it run.
+
+        Args:
+            password (str): Password to hash.
+
+        Raises:
+            Overloaded: If too much hashing work is queued, or the hash
+                timed out.
+
+        Returns:
+            bytes: Hashed password.
+        """
+        with self._admission.admit():
+            return self._hasher.hash_password(password)
+
+    def _check_password(self, password: str, hashed_password: bytes) -> bool:
+        """Check a password on the hash executor once the admission
+        controller lets it run.
+
+        Args:
+            password (str): Password to check.
+            hashed_password (bytes): Hashed password.
+
+        Raises:
+            Overloaded: If too much hashing work is queued, or the check
+                timed out.
+
+        Returns:
+            bool: True if the password matches, else False.
+        """
+        with self._admission.admit():
+            return self._hasher.check_password(password, hashed_password)
 
     def register_user(self, email: str, password: str) -> User:
         """Create a new user if they don't exist.
@@ -54,15 +256,93 @@ class Auth:
         Returns:
             User: The newly created user.
         """
+        # Indexed lookup, saves hashing the password of a known email. The
+        # unique constraint on email settles concurrent registrations.
         try:
             if self._db.find_user_by(email=email):
                 raise ValueError(f"User {email} already exists")
         except NoResultFound:
             pass
 
-        hashed_password = _hash_password(password)
+        hashed_password = self._hash_password(password)
+
+        try:
+            return self._db.add_user(email, hashed_password)
+        except IntegrityError:
+            raise ValueError(f"User {email} already exists")
+
+    def register_users(
+        self,
+        users: Iterable[Tuple[str, str]],
+        batch_size: int = 1000,
+        rounds: int = 12,
+    ) -> Iterator[Tuple[str, bool]]:
+        """Create many users, e.g. to seed the database.
+
+        The input is read one batch at a time. The passwords of a batch are
+        hashed in parallel on the hash executor while the previous batch is
+        inserted with one executemany, so memory stays flat whatever the
+        number of users.
+
+        Args:
+            users (Iterable[Tuple[str, str]]): Emails and passwords.
+            batch_size (int, optional): Users per transaction. Defaults to
+                1000.
+            rounds (int, optional): bcrypt cost factor. Defaults to 12, test
+                accounts may use down to 4.
+
+        Yields:
+            Tuple[str, bool]: Each email, in input order, with True if the
+                user was created or False if the email was already taken.
+        """
+        users = iter(users)
+        pending = None
+        while True:
+            batch = list(islice(users, batch_size))
+            hashing = self._submit_batch(batch, rounds) if batch else None
+
+            if pending is not None:
+                yield from self._insert_batch(pending)
+            if hashing is None:
+                return
+            pending = hashing
+
+    def _submit_batch(self, batch: List[Tuple[str, str]], rounds: int) -> list:
+        """Submit the hashes of the new users of a batch.
 
-        return self._db.add_user(email, hashed_password)
+        Returns:
+            list: Each email with the future of its hashed password, or None
+                if the email is taken.
+        """
+        taken = self._db.find_emails(email for email, _ in batch)
+
+        submitted = []
+        for email, password in batch:
+            if email in taken:
+                submitted.append((email, None))
+            else:
+                taken.add(email)
+                submitted.append(
+                    (email, self._hasher.submit_hash(password, rounds))
+                )
+
+        return submitted
+
+    def _insert_batch(self, submitted: list) -> Iterator[Tuple[str, bool]]:
+        """Insert the new users of a batch once their passwords are hashed.
+
+        Yields:
+            Tuple[str, bool]: Each email, with True if the user was created.
+        """
+        new_users = [
+            (email, future.result())
+            for email, future in submitted
+            if future is not None
+        ]
+        created = iter(self._db.add_users(new_users))
+
+        for email, future in submitted:
+            yield email, future is not None and next(created)
 
     def valid_login(self, email: str, password: str) -> bool:
         """Validate a login.
@@ -79,10 +359,44 @@ class Auth:
         except NoResultFound:
             return False
 
-        return bcrypt.checkpw(password.encode(), user.hashed_password)
+        return self._check_password(password, user.hashed_password)
+
+    def login(self, email: str, password: str) -> Optional[str]:
+        """Validate a login and create a session for the user.
+
+        Costs one lookup, one password check and one session write. The
+        write only happens if the password is still the one checked.
+
+        Args:
+            email (str): The user's email.
+            password (str): The user's password.
+
+        Returns:
+            Optional[str]: The new session id, None if the login is invalid.
+        """
+        try:
+            user = self._db.find_user_by(email=email)
+        except NoResultFound:
+            return None
+
+        if not self._check_password(password, user.hashed_password):
+            return None
+
+        session_id = _generate_uuid()
+        created = self._db.add_session(
+            user.id,
+            session_id,
+            self._expires_at(),
+            {"hashed_password": user.hashed_password},
+        )
+        self._purge_expired_periodically()
+
+        return session_id if created else None
 
     def create_session(self, email: str) -> str:
-        """Get session id.
+        """Create a new session for a user.
+
+        The other sessions of the user stay valid.
 
         Args:
             email (str): The user's email.
@@ -92,42 +406,88 @@ class Auth:
         """
         try:
             user = self._db.find_user_by(email=email)
-            session_id = _generate_uuid()
-            self._db.update_user(user.id, session_id=session_id)
         except NoResultFound:
             return None
 
+        session_id = _generate_uuid()
+        self._db.add_session(user.id, session_id, self._expires_at())
+        self._purge_expired_periodically()
+
         return session_id
 
-    def get_user_from_session_id(self, session_id: str) -> Optional[User]:
+    def get_user_from_session_id(
+        self, session_id: str
+    ) -> Optional[SessionUser]:
         """Get a user from the provided session id.
 
+        Served from the session cache when possible.
+
         Args:
             session_id (str): The user's session id.
 
         Returns:
-            Optional[User]: user with the given session id or None if not found
+            Optional[SessionUser]: user with the given session id or None if
+                not found or expired
         """
         if session_id is None:
             return None
 
+        user, version = self._cached_user(session_id)
+        if user is not None:
+            return user
+
+        now = _utcnow()
         try:
-            user = self._db.find_user_by(session_id=session_id)
+            user, expires_at = self._db.find_session(session_id, now)
         except NoResultFound:
             return None
 
-        return user
+        return self._cache_user(session_id, user, expires_at, version, now)
 
-    def destroy_session(self, user_id: int) -> None:
-        """Destroy user session by setting session id to None.
+    def destroy_session(self, user_id: int, session_id: str = None) -> None:
+        """Destroy a session of a user, or all of them.
 
         Args:
             user_id (int): The user's id
+            session_id (str, optional): The session to destroy. Defaults to
+                None, which destroys every session of the user.
+        """
+        try:
+            if session_id is None:
+                self._db.delete_user_sessions(user_id)
+            else:
+                self._db.delete_session(session_id)
+        finally:
+            self._invalidate(user_id, session_id)
+
+    def purge_expired_sessions(self) -> int:
+        """Delete the expired sessions.
+
+        Returns:
+            int: The number of sessions deleted.
+        """
+        return self._db.purge_expired_sessions(_utcnow())
+
+    def purge_expired_reset_tokens(self) -> int:
+        """Delete the expired reset tokens.
+
+        Returns:
+            int: The number of tokens deleted.
         """
-        return self._db.update_user(user_id, session_id=None)
+        return self._db.purge_expired_reset_tokens(_utcnow())
+
+    def _purge_expired_periodically(self) -> None:
+        """Purge the expired sessions and reset tokens once per
+        SESSION_PURGE_INTERVAL"""
+        if self._purge_due():
+            self.purge_expired_sessions()
+            self.purge_expired_reset_tokens()
 
     def get_reset_password_token(self, email: str) -> str:
-        """Generate a reset token and save it in db.
+        """Generate a reset token and save its digest in db.
+
+        The token replaces the previous ones of the user, and expires after
+        RESET_TOKEN_DURATION seconds.
 
         Args:
             email (str): The user's email.
@@ -142,29 +502,37 @@ class Auth:
         except NoResultFound:
             raise ValueError
 
-        reset_token = _generate_uuid()
-
-        self._db.update_user(user.id, reset_token=reset_token)
+        reset_token, token_hash, expires_at = self._new_reset_token()
+        self._db.add_reset_token(user.id, token_hash, expires_at)
+        self._purge_expired_periodically()
 
         return reset_token
 
     def update_password(self, reset_token: str, password: str) -> None:
-        """Update a user's password.
+        """Update a user's password, spending the reset token.
 
         Args:
             reset_token (str): The reset token of the user.
             password (str): The new password.
 
         Raises:
-            ValueError: If no user is found with the given reset_token
+            ValueError: If the reset token is unknown, expired or spent.
         """
+        if reset_token is None:
+            raise ValueError
+
+        token_hash = _token_digest(reset_token)
         try:
-            user = self._db.find_user_by(reset_token=reset_token)
+            user = self._db.find_user_by_reset_token(token_hash, _utcnow())
         except NoResultFound:
             raise ValueError
 
-        hashed_password = _hash_password(password)
+        hashed_password = self._hash_password(password)
 
-        self._db.update_user(
-            user.id, hashed_password=hashed_password, reset_token=None
-        )
+        try:
+            if not self._db.reset_password(
+                user.id, token_hash, hashed_password
+            ):
+                raise ValueError
+        finally:
+            self._session_cache.invalidate_user(user.id)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Benchmark of Auth.register_users seeding test accounts
+
+Streams synthetic accounts into Auth.register_users, with one duplicate
+every `--duplicate-every` accounts, and reports the accounts created per
+second and the peak memory. Run it from the
+0x03-user_authentication_service directory:
+
+```Bash
+python3 benchmarks/bench_bulk_register.py -n 1000000 --rounds 4
+```
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Iterator, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth import Auth  # noqa: E402
+
+
+def accounts(count: int, duplicate_every: int) -> Iterator[Tuple[str, str]]:
+    """Generate synthetic accounts, repeating an email now and then"""
+    for i in range(count):
+        if duplicate_every and i and i % duplicate_every == 0:
+            yield "user{}@example.com".format(i - 1), "password"
+        else:
+            yield "user{}@example.com".format(i), "password"
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--users", type=int, default=100000)
+    parser.add_argument("-b", "--batch-size", type=int, default=1000)
+    parser.add_argument("-r", "--rounds", type=int, default=4)
+    parser.add_argument("-d", "--duplicate-every", type=int, default=1000)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_bulk_register_"))
+    auth = Auth()
+
+    created = duplicates = 0
+    start = time.perf_counter()
+    for _, is_new in auth.register_users(
+        accounts(args.users, args.duplicate_every),
+        batch_size=args.batch_size,
+        rounds=args.rounds,
+    ):
+        if is_new:
+            created += 1
+        else:
+            duplicates += 1
+    elapsed = time.perf_counter() - start
+
+    print(
+        "{} created, {} duplicates in {:.1f}s".format(
+            created, duplicates, elapsed
+        )
+    )
+    print(
+        "{:.0f} users/s with {} hash workers".format(
+            created / elapsed, auth._hasher.workers
+        )
+    )
+    print(
+        "peak RSS: {:.1f} MiB".format(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
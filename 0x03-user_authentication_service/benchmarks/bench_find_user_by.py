@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of the per-call overhead of DB.find_user_by
+
+Times lookups by email and by id on a small table, so the time goes to
+building and compiling the statement rather than to SQLite, with the cached
+statements of DB.find_user_by and with a fresh query(User).filter_by() per
+call as before. Run it from the 0x03-user_authentication_service directory:
+
+```Bash
+python3 benchmarks/bench_find_user_by.py
+```
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DB_QUERY_STATS", "0")
+
+from db import DB  # noqa: E402
+from user import User  # noqa: E402
+
+
+def filter_by(db: DB, **kwargs) -> User:
+    """Lookup as find_user_by did before caching its statements"""
+    user = db._session.query(User).filter_by(**kwargs).first()
+    db._session.commit()
+    return user
+
+
+def time_calls(lookup, kwargs_list: list) -> float:
+    """Average microseconds per lookup"""
+    start = time.perf_counter()
+    for kwargs in kwargs_list:
+        lookup(**kwargs)
+    return (time.perf_counter() - start) / len(kwargs_list) * 1e6
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-u", "--users", type=int, default=100)
+    parser.add_argument("-n", "--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_find_user_by_"))
+    db = DB()
+    db.add_users(
+        [("user{}@example.com".format(i), b"x") for i in range(args.users)]
+    )
+
+    print(
+        "{:<8} {:>14} {:>14} {:>9}".format(
+            "lookup", "filter_by", "cached", "gain"
+        )
+    )
+    for name, make in (
+        ("email", lambda i: {"email": "user{}@example.com".format(i)}),
+        ("id", lambda i: {"id": i + 1}),
+    ):
+        kwargs_list = [make(i % args.users) for i in range(args.lookups)]
+        # Warm up the compiled caches
+        time_calls(db.find_user_by, kwargs_list[:100])
+        time_calls(lambda **kw: filter_by(db, **kw), kwargs_list[:100])
+
+        before = time_calls(lambda **kw: filter_by(db, **kw), kwargs_list)
+        after = time_calls(db.find_user_by, kwargs_list)
+        print(
+            "{:<8} {:>11.1f} us {:>11.1f} us {:>8.0f}%".format(
+                name, before, after, (1 - after / before) * 100
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
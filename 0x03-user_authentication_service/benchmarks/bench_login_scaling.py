@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark of login throughput against the number of hash workers
+
+Registers a few users, then times Auth.valid_login from many client threads
+with 1 up to `--max-workers` hash workers (defaults to the number of cores).
+The throughput should grow with the workers until the cores run out. Run it
+from the 0x03-user_authentication_service directory:
+
+```Bash
+python3 benchmarks/bench_login_scaling.py --executor thread
+python3 benchmarks/bench_login_scaling.py --executor process
+```
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth import Auth  # noqa: E402
+
+USERS = 8
+PASSWORD = "benchmark-password"
+
+
+def run(workers: int, executor: str, clients: int, logins: int) -> float:
+    """Logins per second with the given number of hash workers"""
+    os.environ["HASH_WORKERS"] = str(workers)
+    os.environ["HASH_EXECUTOR"] = executor
+    # Let the executor, not the admission controller, bound the hashes
+    os.environ["HASH_CONCURRENCY"] = str(clients)
+    os.environ["HASH_MAX_CONCURRENCY"] = str(clients)
+    # Measure throughput, not load shedding
+    os.environ.setdefault("HASH_TIMEOUT", "600")
+    os.environ.setdefault("HASH_QUEUE_TIMEOUT", "600")
+
+    auth = Auth()
+    emails = ["user{}@example.com".format(i) for i in range(USERS)]
+    for email in emails:
+        auth.register_user(email, PASSWORD)
+
+    def login(i: int) -> bool:
+        try:
+            return auth.valid_login(emails[i % USERS], PASSWORD)
+        finally:
+            auth.release_db_session()
+
+    with ThreadPoolExecutor(clients) as pool:
+        start = time.perf_counter()
+        assert all(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - start
+
+    auth._hasher.shutdown()
+    return logins / elapsed
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-e", "--executor", choices=("thread", "process"), default="thread"
+    )
+    parser.add_argument("-w", "--max-workers", type=int, default=None)
+    parser.add_argument("-c", "--clients", type=int, default=32)
+    parser.add_argument("-n", "--logins", type=int, default=200)
+    args = parser.parse_args()
+
+    max_workers = args.max_workers or os.cpu_count() or 1
+    os.chdir(tempfile.mkdtemp(prefix="bench_login_scaling_"))
+
+    print("{:>8} {:>12} {:>9}".format("workers", "logins/s", "speedup"))
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        throughput = run(workers, args.executor, args.clients, args.logins)
+        baseline = baseline or throughput
+        print(
+            "{:>8} {:>12.1f} {:>8.2f}x".format(
+                workers, throughput, throughput / baseline
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
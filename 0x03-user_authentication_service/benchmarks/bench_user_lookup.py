@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark of DB.find_user_by on a large users table
+
+Fills a database with synthetic users, then times the lookups the Auth class
+makes (by email) with the index of user.py, and once more after dropping
+it. Sessions and reset tokens live in their own tables, keyed by the session
+id and the token digest. Run it from the
+0x03-user_authentication_service directory:
+
+```Bash
+python3 benchmarks/bench_user_lookup.py -n 1000000
+```
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from db import DB  # noqa: E402
+from user import User  # noqa: E402
+
+BATCH_SIZE = 50000
+INDEXES = ("ix_users_email",)
+
+
+def fill(db: DB, count: int) -> None:
+    """Insert count synthetic users"""
+    with db._engine.begin() as connection:
+        for start in range(0, count, BATCH_SIZE):
+            connection.execute(
+                insert(User),
+                [
+                    {
+                        "email": "user{}@example.com".format(i),
+                        "hashed_password": "x",
+                    }
+                    for i in range(start, min(start + BATCH_SIZE, count))
+                ],
+            )
+
+
+def time_lookups(db: DB, count: int, lookups: int) -> dict:
+    """Average milliseconds of the lookups by each column"""
+    results = {}
+    for column, template in (("email", "user{}@example.com"),):
+        keys = [
+            template.format(random.randrange(count)) for _ in range(lookups)
+        ]
+        start = time.perf_counter()
+        for key in keys:
+            db.find_user_by(**{column: key})
+        results[column] = (time.perf_counter() - start) / lookups * 1000
+    return results
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--users", type=int, default=1000000)
+    parser.add_argument("-l", "--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_user_lookup_"))
+    db = DB()
+
+    start = time.perf_counter()
+    fill(db, args.users)
+    print(
+        "{} users inserted in {:.1f}s".format(
+            args.users, time.perf_counter() - start
+        )
+    )
+
+    indexed = time_lookups(db, args.users, args.lookups)
+
+    with db._engine.begin() as connection:
+        for index in INDEXES:
+            connection.execute(text("DROP INDEX {}".format(index)))
+    db.remove_session()
+
+    # Full scans are slow, time fewer of them
+    scanned = time_lookups(db, args.users, max(1, args.lookups // 20))
+
+    print("{:<12} {:>14} {:>14}".format("lookup", "indexed (ms)", "scan (ms)"))
+    for column in indexed:
+        print(
+            "{:<12} {:>14.3f} {:>14.3f}".format(
+                column, indexed[column], scanned[column]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
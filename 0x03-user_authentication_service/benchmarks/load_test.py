@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""Load test of the user authentication service
+
+Runs the flow of main.py (register, login, profile, reset password and
+logout) with many concurrent virtual users, each on its own keep-alive
+connection, against a live server or in-process through the Flask test
+client. Reports the throughput and the p50/p95/p99 latencies of each step,
+and writes them as json so runs can be compared. Run it from the
+0x03-user_authentication_service directory:
+
+```Bash
+python3 benchmarks/load_test.py --users 50 --iterations 4
+python3 benchmarks/load_test.py --url http://localhost:5000 -o run.json
+```
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STEPS = (
+    "register",
+    "login",
+    "profile",
+    "reset_token",
+    "update_password",
+    "logout",
+)
+
+
+class HTTPClient:
+    """Client of a live server, keeping its connection alive."""
+
+    def __init__(self, base_url: str):
+        """Initialize a new HTTPClient.
+
+        Args:
+            base_url (str): URL of the server.
+        """
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self._session = requests.Session()
+
+    def request(
+        self, method: str, path: str, data: dict = None, cookies: dict = None
+    ) -> Tuple[int, Optional[dict], dict]:
+        """Send a request.
+
+        Returns:
+            Tuple[int, Optional[dict], dict]: Status, json body and cookies
+                set by the response.
+        """
+        response = self._session.request(
+            method,
+            self.base_url + path,
+            data=data,
+            cookies=cookies,
+            allow_redirects=False,
+        )
+        self._session.cookies.clear()
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, body, response.cookies.get_dict()
+
+
+class InProcessClient:
+    """Client of the Flask app, called in-process."""
+
+    def __init__(self, app):
+        """Initialize a new InProcessClient.
+
+        Args:
+            app (Flask): The app.
+        """
+        self._client = app.test_client(use_cookies=False)
+
+    def request(
+        self, method: str, path: str, data: dict = None, cookies: dict = None
+    ) -> Tuple[int, Optional[dict], dict]:
+        """Send a request.
+
+        Returns:
+            Tuple[int, Optional[dict], dict]: Status, json body and cookies
+                set by the response.
+        """
+        headers = {}
+        if cookies:
+            headers["Cookie"] = "; ".join(
+                "{}={}".format(name, value) for name, value in cookies.items()
+            )
+        response = self._client.open(
+            path, method=method, data=data, headers=headers
+        )
+
+        set_cookies = {}
+        for header in response.headers.getlist("Set-Cookie"):
+            name, _, value = header.split(";")[0].partition("=")
+            set_cookies[name] = value
+        body = response.get_json(silent=True)
+        return response.status_code, body, set_cookies
+
+
+class Recorder:
+    """Latencies and statuses of the steps, shared by the virtual users."""
+
+    def __init__(self):
+        """Initialize a new Recorder"""
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.failures: Dict[str, int] = Counter()
+        self.errors: Dict[str, int] = Counter()
+        self.first_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record(
+        self, step: str, seconds: float, status: int, expected: int
+    ) -> bool:
+        """Record a step.
+
+        Returns:
+            bool: True if the step returned the expected status.
+        """
+        ok = status == expected
+        with self._lock:
+            self.latencies[step].append(seconds)
+            self.statuses[step][status] += 1
+            if not ok:
+                self.failures[step] += 1
+        return ok
+
+    def record_error(self, step: str, error: Exception) -> None:
+        """Record a step whose request raised instead of getting a response.
+
+        Args:
+            step (str): The step.
+            error (Exception): The exception raised.
+        """
+        with self._lock:
+            self.statuses[step]["error"] += 1
+            self.failures[step] += 1
+            self.errors[step] += 1
+            if self.first_error is None:
+                self.first_error = "{}: {}".format(step, repr(error))
+
+
+def virtual_user(
+    make_client, recorder: Recorder, run_id: str, user: int, iterations: int
+) -> None:
+    """Run the flow of main.py `iterations` times, as a new user each time.
+
+    Stops an iteration at its first failed step. A request which raises,
+    e.g. because the server can't be reached, fails its step.
+    """
+    client = make_client()
+
+    def step(name, expected, method, path, data=None, cookies=None):
+        """Send the request of a step and record it"""
+        start = time.perf_counter()
+        try:
+            status, body, set_cookies = client.request(
+                method, path, data, cookies
+            )
+        except Exception as error:
+            recorder.record_error(name, error)
+            return False, None, {}
+        elapsed = time.perf_counter() - start
+        ok = recorder.record(name, elapsed, status, expected)
+        return ok, body, set_cookies
+
+    for iteration in range(iterations):
+        email = "vu{}-{}-{}@load.test".format(run_id, user, iteration)
+        password = "password-{}".format(iteration)
+        credentials = {"email": email, "password": password}
+
+        ok, _, _ = step("register", 200, "POST", "/users", credentials)
+        if not ok:
+            continue
+
+        ok, _, set_cookies = step(
+            "login", 200, "POST", "/sessions", credentials
+        )
+        if not ok or "session_id" not in set_cookies:
+            continue
+        cookies = {"session_id": set_cookies["session_id"]}
+
+        ok, _, _ = step("profile", 200, "GET", "/profile", cookies=cookies)
+        if not ok:
+            continue
+
+        ok, body, _ = step(
+            "reset_token", 200, "POST", "/reset_password", {"email": email}
+        )
+        if not ok or not body:
+            continue
+
+        data = {
+            "email": email,
+            "reset_token": body.get("reset_token"),
+            "new_password": password + "-new",
+        }
+        ok, _, _ = step("update_password", 200, "PUT", "/reset_password", data)
+        if not ok:
+            continue
+
+        step("logout", 303, "DELETE", "/sessions", cookies=cookies)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    rank = int(round(fraction * len(values))) - 1
+    return values[max(0, min(len(values) - 1, rank))]
+
+
+def report(recorder: Recorder, elapsed: float) -> dict:
+    """Summarize the steps.
+
+    Returns:
+        dict: For each step, the count of responses, failures, requests
+            which raised, statuses, throughput and latencies in milliseconds.
+    """
+    steps = {}
+    for step in STEPS:
+        latencies = sorted(recorder.latencies.get(step, ()))
+        steps[step] = {
+            "count": len(latencies),
+            "failures": recorder.failures.get(step, 0),
+            "errors": recorder.errors.get(step, 0),
+            "statuses": dict(
+                sorted(
+                    (str(status), count)
+                    for status, count in recorder.statuses[step].items()
+                )
+            ),
+            "throughput": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        }
+    return steps
+
+
+def main():
+    """Run the load test"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--url", help="URL of a live server, else the app runs in-process"
+    )
+    parser.add_argument("-u", "--users", type=int, default=20)
+    parser.add_argument("-i", "--iterations", type=int, default=5)
+    parser.add_argument("-o", "--output", help="Path of the json results")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    if args.url:
+        target = args.url
+
+        def make_client():
+            return HTTPClient(args.url)
+
+    else:
+        target = "in-process"
+        if "DB_URL" not in os.environ:
+            os.chdir(tempfile.mkdtemp(prefix="load_test_"))
+        from app import app
+
+        def make_client():
+            return InProcessClient(app)
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.users) as pool:
+        futures = [
+            pool.submit(
+                virtual_user,
+                make_client,
+                recorder,
+                run_id,
+                user,
+                args.iterations,
+            )
+            for user in range(args.users)
+        ]
+    elapsed = time.perf_counter() - start
+
+    crashes = 0
+    for future in futures:
+        try:
+            future.result()
+        except Exception:
+            if crashes == 0:
+                traceback.print_exc()
+            crashes += 1
+
+    steps = report(recorder, elapsed)
+    requests_count = sum(step["count"] for step in steps.values())
+
+    print(
+        "{} virtual users x {} iterations against {}: {} requests in "
+        "{:.1f}s ({:.1f} req/s)".format(
+            args.users,
+            args.iterations,
+            target,
+            requests_count,
+            elapsed,
+            requests_count / elapsed,
+        )
+    )
+    print(
+        "{:<16} {:>7} {:>7} {:>9} {:>9} {:>9} {:>9}".format(
+            "step", "count", "failed", "req/s", "p50 ms", "p95 ms", "p99 ms"
+        )
+    )
+    for name, step in steps.items():
+        print(
+            "{:<16} {:>7} {:>7} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}".format(
+                name,
+                step["count"],
+                step["failures"],
+                step["throughput"],
+                step["p50_ms"],
+                step["p95_ms"],
+                step["p99_ms"],
+            )
+        )
+
+    if output:
+        results = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "target": target,
+            "users": args.users,
+            "iterations": args.iterations,
+            "cpu_count": os.cpu_count(),
+            "elapsed_s": elapsed,
+            "requests": requests_count,
+            "throughput": requests_count / elapsed,
+            "crashed_users": crashes,
+            "steps": steps,
+        }
+        with open(output, "w") as file:
+            json.dump(results, file, indent=2)
+        print("results written to {}".format(output))
+
+    errors = sum(step["errors"] for step in steps.values())
+    if errors:
+        print(
+            "{} request(s) raised, first one in {}".format(
+                errors, recorder.first_error
+            ),
+            file=sys.stderr,
+        )
+    if crashes:
+        print("{} virtual user(s) crashed".format(crashes), file=sys.stderr)
+    if errors or crashes:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,31 +2,160 @@
 
 """DB module
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import DateTime, String, create_engine, event, literal
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql import Select
+
+from migrations import migrate, reset
+from query_stats import get_query_stats
+from reset_token import ResetToken
+from user import User
+from user_session import UserSession
+
+# Columns update_user may set, checked without loading the user
+USER_COLUMNS = frozenset(User.__table__.columns.keys())
+
+# Statements of find_user_by, by shape of the kwargs
+_FIND_USER_STATEMENTS: Dict[Tuple[Tuple[str, bool], ...], Select] = {}
+
+
+def _find_user_statement(kwargs: dict) -> Select:
+    """Get the statement selecting a user by the kwargs provided.
+
+    The statement is built once per set of keys, with a bound parameter for
+    each value, so later calls skip building it and hit the compiled cache
+    of the engine. None values compare with IS NULL, as in filter_by.
+
+    Raises:
+        InvalidRequestError: If a key in kwargs is not a valid column.
+
+    Returns:
+        Select: The statement, to run with the kwargs as parameters.
+    """
+    shape = tuple(
+        sorted((key, value is None) for key, value in kwargs.items())
+    )
+    statement = _FIND_USER_STATEMENTS.get(shape)
+    if statement is not None:
+        return statement
 
-from user import Base, User
+    unknown = kwargs.keys() - USER_COLUMNS
+    if unknown:
+        raise InvalidRequestError(
+            "users has no column {}".format(", ".join(sorted(unknown)))
+        )
+
+    statement = (
+        select(User)
+        .where(
+            *(
+                getattr(User, key).is_(None)
+                if is_none
+                else getattr(User, key) == bindparam(key)
+                for key, is_none in shape
+            )
+        )
+        .limit(1)
+    )
+    _FIND_USER_STATEMENTS[shape] = statement
+
+    return statement
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Tune every new SQLite connection of the pool.
+
+    WAL lets readers run alongside a writer, and writers wait on each other
+    instead of failing with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA cache_size=-16000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
 
 
 class DB:
-    """DB class"""
+    """DB class
+
+    Each thread gets its own session, which borrows a connection of the
+    engine pool for each transaction. Call remove_session once a thread is
+    done with the database, e.g. at the end of a request.
+
+    Configured through environment variables.
+
+    ```Bash
+    DB_URL -> Database URL (Defaults to sqlite:///a.db)
+    DB_PERSIST -> Keep the existing data if set to 1, else start empty
+    DB_POOL_SIZE -> Pooled connections (Defaults to 2 * cores, at least 4)
+    ```
+
+    The statements run are recorded by a QueryStats, see get_query_stats.
+    """
 
-    def __init__(self) -> None:
-        """Initialize a new DB instance"""
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+    def __init__(self, url: str = None) -> None:
+        """Initialize a new DB instance
+
+        The schema is brought up to date by the migrations. Unless
+        DB_PERSIST is set, the database is wiped first.
+
+        Args:
+            url (str, optional): Database URL. Defaults to DB_URL.
+        """
+        url = make_url(url or os.getenv("DB_URL", "sqlite:///a.db"))
+        pool_size = int(os.getenv("DB_POOL_SIZE", 0)) or max(
+            4, 2 * (os.cpu_count() or 1)
+        )
+        is_sqlite = url.get_backend_name() == "sqlite"
+        self.pool_size = pool_size
+
+        self._engine = create_engine(
+            url,
+            echo=False,
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=pool_size,
+            connect_args={"check_same_thread": False} if is_sqlite else {},
+        )
+        if is_sqlite:
+            event.listen(self._engine, "connect", _set_sqlite_pragmas)
+
+        if os.getenv("DB_PERSIST", "").lower() in ("1", "true"):
+            migrate(self._engine)
+        else:
+            reset(self._engine)
+
+        self.query_stats = get_query_stats()
+        if self.query_stats is not None:
+            self.query_stats.attach(self._engine)
+
+        self.__sessions = scoped_session(
+            sessionmaker(bind=self._engine, expire_on_commit=False)
+        )
 
     @property
     def _session(self) -> Session:
-        """Memoized session object"""
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        """Session of the current thread"""
+        return self.__sessions()
+
+    def remove_session(self) -> None:
+        """Close the session of the current thread and return its connection
+        to the pool.
+        """
+        self.__sessions.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """Creates a new user and stores the user in the database.
@@ -36,16 +165,84 @@ class DB:
             email (str): The user email.
             hashed_password (str): The user hashed password.
 
+        Raises:
+            IntegrityError: If a user with the same email already exists.
+
         Returns:
             User: The newly created user.
         """
         user = User(email=email, hashed_password=hashed_password)
 
         self._session.add(user)
-        self._session.commit()
+        try:
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
 
         return user
 
+    def add_users(self, users: List[Tuple[str, bytes]]) -> List[bool]:
+        """Creates many users in one transaction, with one executemany.
+
+        If a user already exists, the users are created one by one instead,
+        so each duplicate is skipped and reported.
+
+        Args:
+            users (List[Tuple[str, bytes]]): Emails and hashed passwords.
+
+        Returns:
+            List[bool]: For each user, True if created, False if a user with
+                the same email already exists.
+        """
+        if not users:
+            return []
+
+        try:
+            self._session.execute(
+                insert(User),
+                [
+                    {"email": email, "hashed_password": hashed_password}
+                    for email, hashed_password in users
+                ],
+            )
+            self._session.commit()
+            return [True] * len(users)
+        except IntegrityError:
+            self._session.rollback()
+
+        created = []
+        for email, hashed_password in users:
+            try:
+                self._session.execute(
+                    insert(User).values(
+                        email=email, hashed_password=hashed_password
+                    )
+                )
+                self._session.commit()
+                created.append(True)
+            except IntegrityError:
+                self._session.rollback()
+                created.append(False)
+
+        return created
+
+    def find_emails(self, emails: Iterable[str]) -> Set[str]:
+        """Find which of the emails belong to a user, in one query.
+
+        Args:
+            emails (Iterable[str]): Emails to look for.
+
+        Returns:
+            Set[str]: The emails of existing users.
+        """
+        found = self._session.scalars(
+            select(User.email).where(User.email.in_(list(emails)))
+        ).all()
+        self._session.commit()
+
+        return set(found)
+
     def find_user_by(self, **kwargs) -> User:
         """Find a user by the kwargs provided.
 
@@ -56,7 +253,14 @@ class DB:
         Returns:
             User: The first user found.
         """
-        user = self._session.query(User).filter_by(**kwargs).first()
+        statement = _find_user_statement(kwargs)
+        user = self._session.scalars(
+            statement,
+            {key: value for key, value in kwargs.items() if value is not None},
+        ).first()
+        # End the read transaction, so the connection goes back to the pool
+        # while the caller hashes passwords.
+        self._session.commit()
 
         if user is None:
             raise NoResultFound
@@ -66,20 +270,284 @@ class DB:
     def update_user(self, user_id: int, **kwargs) -> None:
         """Update a user with the given user id.
 
+        Runs a single UPDATE statement, without loading the user.
+
         Args:
             user_id (int): The id of the user to update.
 
         Raises:
             ValueError: If a given argument doesn't correspond to a user
                 attribute.
+            NoResultFound: If no user has the given id.
         """
-        user = self.find_user_by(id=user_id)
+        if not kwargs:
+            self.find_user_by(id=user_id)
+            return
+
+        if not self.update_user_if(user_id, {}, **kwargs):
+            raise NoResultFound
 
-        for key, value in kwargs.items():
-            if hasattr(user, key):
-                setattr(user, key, value)
-            else:
-                raise ValueError
+    def update_user_if(self, user_id: int, expected: dict, **kwargs) -> bool:
+        """Update a user if its columns still hold the expected values.
 
-        self._session.add(user)
+        Runs a single UPDATE statement, without loading the user.
+
+        Args:
+            user_id (int): The id of the user to update.
+            expected (dict): Values the columns must hold for the update to
+                happen.
+
+        Raises:
+            ValueError: If a given argument doesn't correspond to a user
+                attribute.
+
+        Returns:
+            bool: True if the user was updated, else False.
+        """
+        if (kwargs.keys() | expected.keys()) - USER_COLUMNS:
+            raise ValueError
+
+        statement = update(User).where(User.id == user_id).values(**kwargs)
+        for key, value in expected.items():
+            statement = statement.where(getattr(User, key) == value)
+
+        return self._execute(statement) > 0
+
+    def add_session(
+        self,
+        user_id: int,
+        session_id: str,
+        expires_at: datetime,
+        expected: dict = None,
+    ) -> bool:
+        """Create a session for a user, in a single INSERT ... SELECT.
+
+        Args:
+            user_id (int): The id of the user.
+            session_id (str): The session id.
+            expires_at (datetime): End of validity of the session, in UTC.
+            expected (dict, optional): Values the user columns must hold for
+                the session to be created. Defaults to None.
+
+        Raises:
+            ValueError: If a key of expected isn't a user attribute.
+
+        Returns:
+            bool: True if the session was created, False if no user matched.
+        """
+        expected = expected or {}
+        if expected.keys() - USER_COLUMNS:
+            raise ValueError
+
+        source = select(
+            literal(session_id, String()),
+            User.id,
+            literal(expires_at, DateTime()),
+        ).where(User.id == user_id)
+        for key, value in expected.items():
+            source = source.where(getattr(User, key) == value)
+
+        return self._execute(
+            insert(UserSession.__table__).from_select(
+                ["session_id", "user_id", "expires_at"], source
+            )
+        ) > 0
+
+    def find_session(
+        self, session_id: str, now: datetime
+    ) -> Tuple[User, datetime]:
+        """Find the user of a session which hasn't expired.
+
+        Args:
+            session_id (str): The session id.
+            now (datetime): Current time, in UTC.
+
+        Raises:
+            NoResultFound: If the session doesn't exist or expired.
+
+        Returns:
+            Tuple[User, datetime]: The user and the end of validity of the
+                session.
+        """
+        row = self._session.execute(
+            select(User, UserSession.expires_at)
+            .join(UserSession, UserSession.user_id == User.id)
+            .where(
+                UserSession.session_id == session_id,
+                UserSession.expires_at > now,
+            )
+        ).first()
         self._session.commit()
+
+        if row is None:
+            raise NoResultFound
+
+        return row[0], row[1]
+
+    def delete_session(self, session_id: str) -> bool:
+        """Delete a session.
+
+        Args:
+            session_id (str): The session id.
+
+        Returns:
+            bool: True if the session existed, else False.
+        """
+        return self._execute(
+            delete(UserSession.__table__).where(
+                UserSession.session_id == session_id
+            )
+        ) > 0
+
+    def delete_user_sessions(self, user_id: int) -> int:
+        """Delete every session of a user.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            int: The number of sessions deleted.
+        """
+        return self._execute(
+            delete(UserSession.__table__).where(
+                UserSession.user_id == user_id
+            )
+        )
+
+    def purge_expired_sessions(self, now: datetime) -> int:
+        """Delete the expired sessions in one range delete on the
+        expires_at index.
+
+        Args:
+            now (datetime): Current time, in UTC.
+
+        Returns:
+            int: The number of sessions deleted.
+        """
+        return self._execute(
+            delete(UserSession.__table__).where(
+                UserSession.expires_at <= now
+            )
+        )
+
+    def add_reset_token(
+        self, user_id: int, token_hash: str, expires_at: datetime
+    ) -> None:
+        """Store the reset token of a user, replacing their previous ones.
+
+        Args:
+            user_id (int): The id of the user.
+            token_hash (str): Digest of the token.
+            expires_at (datetime): End of validity of the token, in UTC.
+        """
+        try:
+            self._session.execute(
+                delete(ResetToken.__table__).where(
+                    ResetToken.user_id == user_id
+                )
+            )
+            self._session.execute(
+                insert(ResetToken.__table__).values(
+                    token_hash=token_hash,
+                    user_id=user_id,
+                    expires_at=expires_at,
+                )
+            )
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
+
+    def find_user_by_reset_token(self, token_hash: str, now: datetime) -> User:
+        """Find the user of a reset token which hasn't expired.
+
+        Args:
+            token_hash (str): Digest of the token.
+            now (datetime): Current time, in UTC.
+
+        Raises:
+            NoResultFound: If the token doesn't exist or expired.
+
+        Returns:
+            User: The user.
+        """
+        user = self._session.scalars(
+            select(User)
+            .join(ResetToken, ResetToken.user_id == User.id)
+            .where(
+                ResetToken.token_hash == token_hash,
+                ResetToken.expires_at > now,
+            )
+        ).first()
+        self._session.commit()
+
+        if user is None:
+            raise NoResultFound
+
+        return user
+
+    def reset_password(
+        self, user_id: int, token_hash: str, hashed_password: bytes
+    ) -> bool:
+        """Spend a reset token and set the new password, in one transaction.
+
+        Args:
+            user_id (int): The id of the user.
+            token_hash (str): Digest of the token.
+            hashed_password (bytes): The new hashed password.
+
+        Returns:
+            bool: True if the password was set, False if the token was
+                already spent.
+        """
+        try:
+            spent = self._session.execute(
+                delete(ResetToken.__table__).where(
+                    ResetToken.token_hash == token_hash,
+                    ResetToken.user_id == user_id,
+                )
+            )
+            if spent.rowcount == 0:
+                self._session.rollback()
+                return False
+
+            self._session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(hashed_password=hashed_password)
+            )
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
+
+        return True
+
+    def purge_expired_reset_tokens(self, now: datetime) -> int:
+        """Delete the expired reset tokens in one range delete on the
+        expires_at index.
+
+        Args:
+            now (datetime): Current time, in UTC.
+
+        Returns:
+            int: The number of tokens deleted.
+        """
+        return self._execute(
+            delete(ResetToken.__table__).where(ResetToken.expires_at <= now)
+        )
+
+    def _execute(self, statement) -> int:
+        """Run a write statement in its own transaction.
+
+        Returns:
+            int: The number of rows affected.
+        """
+        try:
+            result = self._session.execute(statement)
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
+
+        return result.rowcount
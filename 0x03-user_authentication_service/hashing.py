@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""hashing module"""
+
+import atexit
+import os
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+from admission import Overloaded
+
+
+def _hashpw(password: bytes, rounds: int = 12) -> bytes:
+    """Hash a password with a new salt."""
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password: bytes, hashed_password: bytes) -> bool:
+    """Check a password against its hash."""
+    return bcrypt.checkpw(password, hashed_password)
+
+
+class HashExecutor:
+    """Runs bcrypt off the request threads, on a pool sized to the cores.
+
+    bcrypt releases the GIL while hashing, so a thread pool runs as many
+    hashes at once as there are workers. A process pool is available too.
+    """
+
+    def __init__(
+        self, workers: int = None, kind: str = "thread", timeout: float = 10.0
+    ):
+        """Initialize a new HashExecutor.
+
+        Args:
+            workers (int, optional): Number of workers. Defaults to the
+                number of cores.
+            kind (str, optional): `thread` or `process`. Defaults to thread.
+            timeout (float, optional): Seconds to wait for a hash. Defaults
+                to 10.0.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+
+        if kind == "process":
+            self._executor: Executor = ProcessPoolExecutor(self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="bcrypt"
+            )
+
+        atexit.register(self.shutdown)
+
+    def submit_hash(self, password: str, rounds: int = 12) -> Future:
+        """Submit the hash of a password to the workers.
+
+        Args:
+            password (str): Password to hash.
+            rounds (int, optional): bcrypt cost factor. Defaults to 12.
+
+        Returns:
+            Future: Future of the hashed password.
+        """
+        return self._executor.submit(_hashpw, password.encode(), rounds)
+
+    def submit_check(self, password: str, hashed_password: bytes) -> Future:
+        """Submit the check of a password to the workers.
+
+        Args:
+            password (str): Password to check.
+            hashed_password (bytes): Hashed password.
+
+        Returns:
+            Future: Future of the result of the check.
+        """
+        return self._executor.submit(
+            _checkpw, password.encode(), hashed_password
+        )
+
+    def _result(self, future: Future):
+        """Wait for the result of a hash.
+
+        Raises:
+            Overloaded: If the hash didn't complete within the timeout.
+        """
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise Overloaded(self.timeout)
+
+    def hash_password(self, password: str) -> bytes:
+        """Hash a password.
+
+        Args:
+            password (str): Password to hash.
+
+        Raises:
+            Overloaded: If the hash didn't complete within the timeout.
+
+        Returns:
+            bytes: Hashed password.
+        """
+        return self._result(self.submit_hash(password))
+
+    def check_password(self, password: str, hashed_password: bytes) -> bool:
+        """Check a password against its hash.
+
+        Args:
+            password (str): Password to check.
+            hashed_password (bytes): Hashed password.
+
+        Raises:
+            Overloaded: If the check didn't complete within the timeout.
+
+        Returns:
+            bool: True if the password matches, else False.
+        """
+        return self._result(self.submit_check(password, hashed_password))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers, dropping the hashes not started yet.
+
+        Args:
+            wait (bool, optional): Wait for the running hashes. Defaults to
+                True.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def get_hash_executor() -> HashExecutor:
+    """Create the executor of the password hashing work.
+
+    Configured through environment variables.
+
+    ```Bash
+    HASH_WORKERS -> Number of workers (Defaults to the cores)
+    HASH_EXECUTOR -> thread or process (Defaults to thread)
+    HASH_TIMEOUT -> Seconds to wait for a hash (Defaults to 10)
+    ```
+
+    Returns:
+        HashExecutor: The hash executor.
+    """
+    return HashExecutor(
+        workers=int(os.getenv("HASH_WORKERS", 0)) or None,
+        kind=os.getenv("HASH_EXECUTOR", "thread"),
+        timeout=float(os.getenv("HASH_TIMEOUT", 10)),
+    )
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""migrations module
+
+Versioned schema migrations of the database. Each migration runs once, in
+order, and the version reached is kept in the schema_version table.
+
+Brings an existing database up to date with:
+
+```Bash
+python3 migrations.py sqlite:///a.db
+```
+"""
+
+import hashlib
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+from sqlalchemy import DateTime, bindparam, create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+import reset_token  # noqa: F401  Registers its table in Base.metadata
+import user_session  # noqa: F401  Registers its table in Base.metadata
+from user import Base
+
+
+def create_users_table(connection: Connection) -> None:
+    """Create the users table as first shipped.
+
+    Args:
+        connection (Connection): Connection to the database.
+    """
+    connection.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS users ("
+            "id INTEGER NOT NULL PRIMARY KEY, "
+            "email VARCHAR(250) NOT NULL, "
+            "hashed_password VARCHAR(250) NOT NULL, "
+            "session_id VARCHAR(250), "
+            "reset_token VARCHAR(250)"
+            ")"
+        )
+    )
+
+
+def add_user_indexes(connection: Connection) -> None:
+    """Add the indexes of the users table.
+
+    A unique index on email, and indexes on session_id and reset_token.
+
+    Args:
+        connection (Connection): Connection to the database.
+
+    Raises:
+        ValueError: If several users share an email.
+    """
+    duplicates = connection.execute(
+        text(
+            "SELECT email FROM users "
+            "GROUP BY email HAVING COUNT(*) > 1 LIMIT 5"
+        )
+    ).fetchall()
+    if duplicates:
+        raise ValueError(
+            "Duplicate emails: {}".format(
+                ", ".join(row[0] for row in duplicates)
+            )
+        )
+
+    connection.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email "
+            "ON users (email)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_users_session_id "
+            "ON users (session_id)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_users_reset_token "
+            "ON users (reset_token)"
+        )
+    )
+
+
+def create_user_sessions_table(connection: Connection) -> None:
+    """Create the user_sessions table, which holds many sessions per user.
+
+    The sessions in users.session_id are copied over, valid for
+    SESSION_DURATION seconds.
+
+    Args:
+        connection (Connection): Connection to the database.
+    """
+    connection.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS user_sessions ("
+            "session_id VARCHAR(250) NOT NULL PRIMARY KEY, "
+            "user_id INTEGER NOT NULL "
+            "REFERENCES users (id) ON DELETE CASCADE, "
+            "expires_at DATETIME NOT NULL"
+            ")"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_user_sessions_user_id "
+            "ON user_sessions (user_id)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_user_sessions_expires_at "
+            "ON user_sessions (expires_at)"
+        )
+    )
+
+    expires_at = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(
+        seconds=int(os.getenv("SESSION_DURATION", 86400))
+    )
+    connection.execute(
+        text(
+            "INSERT INTO user_sessions (session_id, user_id, expires_at) "
+            "SELECT session_id, id, :expires_at FROM users "
+            "WHERE session_id IS NOT NULL"
+        ).bindparams(bindparam("expires_at", type_=DateTime())),
+        {"expires_at": expires_at},
+    )
+
+
+def drop_users_session_id(connection: Connection) -> None:
+    """Drop users.session_id, replaced by the user_sessions table.
+
+    Args:
+        connection (Connection): Connection to the database.
+    """
+    connection.execute(text("DROP INDEX IF EXISTS ix_users_session_id"))
+    connection.execute(text("ALTER TABLE users DROP COLUMN session_id"))
+
+
+def create_reset_tokens_table(connection: Connection) -> None:
+    """Create the reset_tokens table, keyed by the digest of the tokens.
+
+    The tokens in users.reset_token are copied over, valid for
+    RESET_TOKEN_DURATION seconds.
+
+    Args:
+        connection (Connection): Connection to the database.
+    """
+    connection.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS reset_tokens ("
+            "token_hash VARCHAR(64) NOT NULL PRIMARY KEY, "
+            "user_id INTEGER NOT NULL "
+            "REFERENCES users (id) ON DELETE CASCADE, "
+            "expires_at DATETIME NOT NULL"
+            ")"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_reset_tokens_user_id "
+            "ON reset_tokens (user_id)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_reset_tokens_expires_at "
+            "ON reset_tokens (expires_at)"
+        )
+    )
+
+    expires_at = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(
+        seconds=int(os.getenv("RESET_TOKEN_DURATION", 900))
+    )
+    tokens = [
+        {
+            "token_hash": hashlib.sha256(reset_token.encode()).hexdigest(),
+            "user_id": user_id,
+            "expires_at": expires_at,
+        }
+        for user_id, reset_token in connection.execute(
+            text(
+                "SELECT id, reset_token FROM users "
+                "WHERE reset_token IS NOT NULL"
+            )
+        )
+    ]
+    if tokens:
+        connection.execute(
+            text(
+                "INSERT INTO reset_tokens (token_hash, user_id, expires_at) "
+                "VALUES (:token_hash, :user_id, :expires_at)"
+            ).bindparams(bindparam("expires_at", type_=DateTime())),
+            tokens,
+        )
+
+
+def drop_users_reset_token(connection: Connection) -> None:
+    """Drop users.reset_token, replaced by the reset_tokens table.
+
+    Args:
+        connection (Connection): Connection to the database.
+    """
+    connection.execute(text("DROP INDEX IF EXISTS ix_users_reset_token"))
+    connection.execute(text("ALTER TABLE users DROP COLUMN reset_token"))
+
+
+# Migration i brings the schema to version i + 1. Only ever append to it.
+MIGRATIONS: List[Callable[[Connection], None]] = [
+    create_users_table,
+    add_user_indexes,
+    create_user_sessions_table,
+    drop_users_session_id,
+    create_reset_tokens_table,
+    drop_users_reset_token,
+]
+
+
+def migrate(engine: Engine) -> int:
+    """Run the migrations the database hasn't been through yet.
+
+    The migrations run in one transaction which starts with a write, so
+    processes starting together wait for each other instead of migrating
+    twice.
+
+    Args:
+        engine (Engine): Engine of the database.
+
+    Returns:
+        int: The number of migrations run.
+    """
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_version "
+                "(version INTEGER NOT NULL)"
+            )
+        )
+        # Takes the write lock
+        locked = connection.execute(
+            text("UPDATE schema_version SET version = version")
+        )
+        if locked.rowcount == 0:
+            connection.execute(
+                text("INSERT INTO schema_version (version) VALUES (0)")
+            )
+
+        version = connection.execute(
+            text("SELECT version FROM schema_version")
+        ).scalar()
+
+        for migration in MIGRATIONS[version:]:
+            migration(connection)
+
+        connection.execute(
+            text("UPDATE schema_version SET version = :version"),
+            {"version": len(MIGRATIONS)},
+        )
+
+    return len(MIGRATIONS) - version
+
+
+def reset(engine: Engine) -> None:
+    """Drop the tables of the service and migrate them from scratch.
+
+    Other tables of the database are left untouched.
+
+    Args:
+        engine (Engine): Engine of the database.
+    """
+    Base.metadata.drop_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS schema_version"))
+
+    migrate(engine)
+
+
+if __name__ == "__main__":
+    engine = create_engine(
+        sys.argv[1] if len(sys.argv) > 1 else "sqlite:///a.db"
+    )
+    print("{} migration(s) run".format(migrate(engine)))
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""query stats module"""
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("db.slow_queries")
+
+# Upper bounds of the latency buckets, in milliseconds
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float("inf"))
+
+_WHITESPACE = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN \(\?(?:, \?)*\)", re.IGNORECASE)
+
+
+def normalize(statement: str) -> str:
+    """Reduce a statement to its shape, so its executions group together.
+
+    Literals become `?`, and the lists of placeholders of IN clauses, whose
+    length varies, become `IN (?...)`.
+
+    Args:
+        statement (str): SQL statement.
+
+    Returns:
+        str: The normalized statement.
+    """
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _LITERALS.sub("?", statement)
+    return _IN_LISTS.sub("IN (?...)", statement)
+
+
+def redact(parameters) -> str:
+    """Describe the parameters of a statement without their values.
+
+    Args:
+        parameters: Parameters passed to the DBAPI cursor.
+
+    Returns:
+        str: The type of each parameter, or the number of parameter sets of
+            an executemany.
+    """
+    if isinstance(parameters, list):
+        return "<{} parameter sets>".format(len(parameters))
+    if isinstance(parameters, dict):
+        parameters = parameters.values()
+
+    return "({})".format(
+        ", ".join(
+            "<{}>".format(type(value).__name__) for value in parameters or ()
+        )
+    )
+
+
+class StatementHistogram:
+    """Latencies and row counts of the executions of a statement."""
+
+    def __init__(self):
+        """Initialize a new StatementHistogram"""
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def record(self, elapsed_ms: float, rows: int) -> None:
+        """Record an execution.
+
+        Args:
+            elapsed_ms (float): Milliseconds the execution took.
+            rows (int): Rows affected, -1 if unknown.
+        """
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if rows > 0:
+            self.rows += rows
+
+        for i, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def to_json(self) -> dict:
+        """Get the histogram as a json serializable dict.
+
+        Returns:
+            dict: Count, mean, max, rows and cumulative bucket counts.
+        """
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            cumulative += count
+            buckets.append(
+                {
+                    "le": "+Inf" if bound == float("inf") else bound,
+                    "count": cumulative,
+                }
+            )
+
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "rows": self.rows,
+            "buckets_ms": buckets,
+        }
+
+
+class QueryStats:
+    """Records the timings of the statements run by an engine.
+
+    Executions are grouped by normalized statement into histograms, and the
+    ones slower than `slow_ms` are logged to the `db.slow_queries` logger
+    with their parameters redacted. Rows are the ones reported by the DBAPI
+    cursor: sqlite3 reports the rows written, not the rows read.
+    """
+
+    # Statements tracked at most, the others are grouped together
+    MAX_STATEMENTS = 1000
+
+    def __init__(self, slow_ms: float = 100.0):
+        """Initialize a new QueryStats.
+
+        Args:
+            slow_ms (float, optional): Milliseconds above which a statement
+                is logged as slow. Defaults to 100.0.
+        """
+        self.slow_ms = slow_ms
+        self.slow_queries = 0
+        self._histograms: Dict[str, StatementHistogram] = {}
+        self._normalized: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, engine: Engine) -> None:
+        """Listen to the statements run by an engine.
+
+        Args:
+            engine (Engine): The engine.
+        """
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        event.listen(engine, "handle_error", self._error)
+
+    def _before(self, conn, cursor, statement, parameters, context, many):
+        """Start timing a statement"""
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _error(self, exception_context) -> None:
+        """Stop timing a statement which failed"""
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+    def _after(self, conn, cursor, statement, parameters, context, many):
+        """Record the timing of a statement"""
+        start = conn.info["query_start"].pop()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        slow = elapsed_ms >= self.slow_ms
+
+        with self._lock:
+            normalized = self._normalized.get(statement)
+            if normalized is None:
+                normalized = normalize(statement)
+                if len(self._normalized) < self.MAX_STATEMENTS:
+                    self._normalized[statement] = normalized
+
+            histogram = self._histograms.get(normalized)
+            if histogram is None:
+                if len(self._histograms) >= self.MAX_STATEMENTS:
+                    normalized = "<other>"
+                histogram = self._histograms.setdefault(
+                    normalized, StatementHistogram()
+                )
+            histogram.record(elapsed_ms, cursor.rowcount)
+            if slow:
+                self.slow_queries += 1
+
+        if slow:
+            logger.warning(
+                "slow query (%.1f ms): %s %s",
+                elapsed_ms,
+                normalized,
+                redact(parameters),
+            )
+
+    def metrics(self) -> dict:
+        """Get the histograms of the statements, slowest total first.
+
+        Returns:
+            dict: Number of slow queries, and the histograms of the
+                normalized statements.
+        """
+        with self._lock:
+            statements = sorted(
+                self._histograms.items(),
+                key=lambda item: item[1].total_ms,
+                reverse=True,
+            )
+            return {
+                "slow_queries": self.slow_queries,
+                "statements": [
+                    dict(statement=statement, **histogram.to_json())
+                    for statement, histogram in statements
+                ],
+            }
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    """Create the statement recorder of the database.
+
+    Configured through environment variables.
+
+    ```Bash
+    DB_QUERY_STATS -> Set to 0 to disable the recording (Defaults to 1)
+    DB_SLOW_QUERY_MS -> Milliseconds above which a statement is logged
+        (Defaults to 100)
+    ```
+
+    Returns:
+        Optional[QueryStats]: The recorder, None if disabled.
+    """
+    if os.getenv("DB_QUERY_STATS", "1").lower() in ("0", "false"):
+        return None
+
+    return QueryStats(slow_ms=float(os.getenv("DB_SLOW_QUERY_MS", 100)))
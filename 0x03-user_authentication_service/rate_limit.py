@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""Rate limit module
+
+Login attempts are limited with token buckets keyed by client IP and by
+target email. Limits are set through env variables as `<attempts>/<seconds>`:
+
+- RATE_LIMIT_PER_IP: attempts allowed per client IP (e.g. `20/60`)
+- RATE_LIMIT_PER_EMAIL: attempts allowed per email (e.g. `5/60`)
+
+Unset limits are disabled. The buckets live in the memory of the process
+unless RATE_LIMIT_STORE is `sqlite`, which keeps them in a SQLite database
+at RATE_LIMIT_STORE_PATH (defaults to `.db_rate_limits.sqlite3`) shared by
+every worker process on the host.
+"""
+
+import sqlite3
+import threading
+import time
+from os import getenv
+from typing import Optional
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a client made too many attempts"""
+
+    def __init__(self, retry_after: float):
+        """Initialize a new RateLimitExceeded
+
+        Args:
+            retry_after (float): Seconds before the next allowed attempt.
+        """
+        super().__init__("Rate limit exceeded")
+        self.retry_after = retry_after
+
+
+class MemoryBucketStore:
+    """MemoryBucketStore class
+    Keeps the token buckets in the memory of the process.
+    """
+
+    # Number of takes between two evictions of the idle buckets
+    EVICT_EVERY = 1024
+
+    def __init__(self):
+        """Initialize a new MemoryBucketStore"""
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._takes = 0
+
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        """Take a token from a bucket.
+
+        Args:
+            key (str): Key of the bucket.
+            rate (float): Tokens added to the bucket per second.
+            burst (int): Capacity of the bucket.
+            now (float): Current time.
+
+        Returns:
+            float: 0 if a token was taken, else the seconds to wait for one.
+        """
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+
+            # A bucket is dropped once full again, as it equals a new one
+            full_at = now + (burst - tokens) / rate
+            self._buckets[key] = (tokens, now, full_at)
+
+            self._takes += 1
+            if self._takes % self.EVICT_EVERY == 0:
+                self._buckets = {
+                    key: bucket
+                    for key, bucket in self._buckets.items()
+                    if bucket[2] > now
+                }
+
+        return wait
+
+    def peek(self, key: str, rate: float, burst: int, now: float) -> float:
+        """Check a bucket without taking a token.
+
+        Args:
+            key (str): Key of the bucket.
+            rate (float): Tokens added to the bucket per second.
+            burst (int): Capacity of the bucket.
+            now (float): Current time.
+
+        Returns:
+            float: 0 if a token is available, else the seconds to wait for
+                one.
+        """
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (burst, now, now))
+
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        return 0 if tokens >= 1 else (1 - tokens) / rate
+
+
+class SQLiteBucketStore:
+    """SQLiteBucketStore class
+    Keeps the token buckets in a SQLite database in WAL mode shared by every
+    worker process on the host. Each thread uses its own connection.
+    """
+
+    EVICT_EVERY = 1024
+
+    def __init__(self, db_path: str):
+        """Initialize a new SQLiteBucketStore
+
+        Args:
+            db_path (str): Path of the SQLite database.
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._takes = 0
+
+        with self._connection as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated_at REAL NOT NULL, full_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS buckets_full_at "
+                "ON buckets (full_at)"
+            )
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """Connection of the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=30, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, now):
+        """Take a token from a bucket"""
+        conn = self._connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated_at = row if row else (burst, now)
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets "
+                "(key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (burst - tokens) / rate),
+            )
+
+            self._takes += 1
+            if self._takes % self.EVICT_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        return wait
+
+    def peek(self, key, rate, burst, now):
+        """Check a bucket without taking a token"""
+        row = self._connection.execute(
+            "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+        ).fetchone()
+        tokens, updated_at = row if row else (burst, now)
+
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        return 0 if tokens >= 1 else (1 - tokens) / rate
+
+
+class TokenBucketLimiter:
+    """TokenBucketLimiter class
+    Allows `limit` attempts per `period` seconds for each key, in bursts of
+    up to `limit` attempts.
+    """
+
+    def __init__(self, name: str, limit: int, period: float, store):
+        """Initialize a new TokenBucketLimiter
+
+        Args:
+            name (str): Name of the limiter, prefixes the bucket keys.
+            limit (int): Attempts allowed per period.
+            period (float): Period in seconds.
+            store (MemoryBucketStore | SQLiteBucketStore): Bucket store.
+        """
+        self.name = name
+        self.burst = limit
+        self.rate = limit / period
+        self.store = store
+
+    def take(self, key: str) -> float:
+        """Count an attempt for a key.
+
+        Args:
+            key (str): The key, an IP or an email.
+
+        Returns:
+            float: 0 if the attempt is allowed, else the seconds to wait.
+        """
+        return self.store.take(
+            "{}:{}".format(self.name, key), self.rate, self.burst, time.time()
+        )
+
+    def peek(self, key: str) -> float:
+        """Check whether an attempt would be allowed, without counting it.
+
+        Args:
+            key (str): The key, an IP or an email.
+
+        Returns:
+            float: 0 if an attempt is allowed, else the seconds to wait.
+        """
+        return self.store.peek(
+            "{}:{}".format(self.name, key), self.rate, self.burst, time.time()
+        )
+
+
+class LoginRateLimiter:
+    """LoginRateLimiter class
+    Limits the login attempts per client IP and per email.
+    """
+
+    def __init__(
+        self,
+        per_ip: Optional[TokenBucketLimiter],
+        per_email: Optional[TokenBucketLimiter],
+    ):
+        """Initialize a new LoginRateLimiter
+
+        Args:
+            per_ip (Optional[TokenBucketLimiter]): Limiter of the client IPs.
+            per_email (Optional[TokenBucketLimiter]): Limiter of the emails.
+        """
+        self.per_ip = per_ip
+        self.per_email = per_email
+        self.rejections = 0
+
+    def check(self, ip: str, email: str):
+        """Count a login attempt.
+
+        Args:
+            ip (str): The client IP.
+            email (str): The email the client tries to log in as.
+
+        Raises:
+            RateLimitExceeded: If the client IP or the email made too many
+                attempts.
+        """
+        wait = 0
+        if self.per_ip is not None and ip:
+            wait = self.per_ip.take(ip)
+        if wait == 0 and self.per_email is not None and email:
+            wait = self.per_email.take(email)
+
+        if wait > 0:
+            self.rejections += 1
+            raise RateLimitExceeded(wait)
+
+    def check_allowed(self, ip: str, email: str):
+        """Check that a login attempt is allowed, without counting it.
+
+        Args:
+            ip (str): The client IP.
+            email (str): The email the client tries to log in as.
+
+        Raises:
+            RateLimitExceeded: If the client IP or the email made too many
+                attempts.
+        """
+        wait = 0
+        if self.per_ip is not None and ip:
+            wait = self.per_ip.peek(ip)
+        if wait == 0 and self.per_email is not None and email:
+            wait = self.per_email.peek(email)
+
+        if wait > 0:
+            self.rejections += 1
+            raise RateLimitExceeded(wait)
+
+    def count_failure(self, ip: str, email: str):
+        """Count a failed login attempt.
+
+        Args:
+            ip (str): The client IP.
+            email (str): The email the client tried to log in as.
+        """
+        if self.per_ip is not None and ip:
+            self.per_ip.take(ip)
+        if self.per_email is not None and email:
+            self.per_email.take(email)
+
+
+def _parse_limit(value: str) -> Optional[tuple]:
+    """Parse a limit formatted as `<attempts>/<seconds>`"""
+    if not value:
+        return None
+
+    limit, _, period = value.partition("/")
+    return int(limit), float(period or 1)
+
+
+def get_login_rate_limiter() -> Optional[LoginRateLimiter]:
+    """Create the login rate limiter configured through the env variables.
+
+    Returns:
+        Optional[LoginRateLimiter]: The limiter, None if no limit is set.
+    """
+    per_ip = _parse_limit(getenv("RATE_LIMIT_PER_IP"))
+    per_email = _parse_limit(getenv("RATE_LIMIT_PER_EMAIL"))
+
+    if per_ip is None and per_email is None:
+        return None
+
+    if getenv("RATE_LIMIT_STORE", "memory") == "sqlite":
+        store = SQLiteBucketStore(
+            getenv("RATE_LIMIT_STORE_PATH", ".db_rate_limits.sqlite3")
+        )
+    else:
+        store = MemoryBucketStore()
+
+    return LoginRateLimiter(
+        TokenBucketLimiter("ip", *per_ip, store) if per_ip else None,
+        TokenBucketLimiter("email", *per_email, store) if per_email else None,
+    )
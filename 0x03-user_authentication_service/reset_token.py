@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""ResetToken model module"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from user import Base
+
+
+class ResetToken(Base):
+    """ResetToken model
+
+    Only the SHA-256 digest of a token is stored, so a leaked table can't be
+    used to reset passwords. A token is valid until expires_at.
+    """
+
+    __tablename__ = "reset_tokens"
+
+    token_hash = Column(String(64), primary_key=True, nullable=False)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""session cache module"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set
+
+
+class SessionUser(NamedTuple):
+    """Lightweight record of the user owning a session."""
+
+    id: int
+    email: str
+
+
+class SessionCache:
+    """Bounded LRU cache of session id to user, with a time to live.
+
+    The least recently used entry is dropped once `maxsize` entries are
+    cached, and entries older than `ttl` seconds are ignored. The TTL bounds
+    how long another process's logout may go unnoticed here.
+
+    A lookup that missed reads `version` before querying the database and
+    passes it to `put`, which drops the result if an invalidation happened
+    meanwhile, so a stale read never outlives an invalidation.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 30.0):
+        """Initialize a new SessionCache.
+
+        Args:
+            maxsize (int, optional): Maximum number of cached sessions.
+                Defaults to 10000.
+            ttl (float, optional): Seconds an entry stays valid. Defaults to
+                30.0.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.version = 0
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._sessions_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[SessionUser]:
+        """Get the user of a session.
+
+        Args:
+            session_id (str): The session id.
+
+        Returns:
+            Optional[SessionUser]: The user, None if not cached or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._discard(session_id)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(
+        self,
+        session_id: str,
+        user: SessionUser,
+        version: int,
+        ttl: float = None,
+    ) -> None:
+        """Cache the user of a session.
+
+        Args:
+            session_id (str): The session id.
+            user (SessionUser): The user.
+            version (int): Version of the cache when the user was read.
+            ttl (float, optional): Seconds left before the session expires,
+                if shorter than the TTL of the cache. Defaults to None.
+        """
+        if self.maxsize <= 0:
+            return
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            if version != self.version:
+                return
+            self._discard(session_id)
+            self._entries[session_id] = (user, time.monotonic() + ttl)
+            self._sessions_by_user.setdefault(user.id, set()).add(session_id)
+
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop a session from the cache.
+
+        Args:
+            session_id (str): The session id.
+        """
+        with self._lock:
+            self.version += 1
+            self._discard(session_id)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every session of a user from the cache.
+
+        Args:
+            user_id (int): The user id.
+        """
+        with self._lock:
+            self.version += 1
+            for session_id in list(self._sessions_by_user.get(user_id, ())):
+                self._discard(session_id)
+
+    def _discard(self, session_id: str) -> None:
+        """Drop a session, the lock being held"""
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+
+        user_id = entry[0].id
+        sessions = self._sessions_by_user.get(user_id)
+        if sessions is not None:
+            sessions.discard(session_id)
+            if not sessions:
+                del self._sessions_by_user[user_id]
+
+    def metrics(self) -> dict:
+        """Get the metrics of the cache.
+
+        Returns:
+            dict: Size, hits and misses of the cache.
+        """
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def get_session_cache() -> SessionCache:
+    """Create the session cache of Auth.
+
+    Configured through environment variables.
+
+    ```Bash
+    SESSION_CACHE_SIZE -> Maximum number of cached sessions (Defaults to
+        10000, 0 disables the cache)
+    SESSION_CACHE_TTL -> Seconds an entry stays valid (Defaults to 30)
+    ```
+
+    Returns:
+        SessionCache: The session cache.
+    """
+    return SessionCache(
+        maxsize=int(os.getenv("SESSION_CACHE_SIZE", 10000)),
+        ttl=float(os.getenv("SESSION_CACHE_TTL", 30)),
+    )
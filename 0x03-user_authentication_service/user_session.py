@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""UserSession model module"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from user import Base
+
+
+class UserSession(Base):
+    """UserSession model
+
+    A user may have many sessions, each valid until expires_at.
+    """
+
+    __tablename__ = "user_sessions"
+
+    session_id = Column(String(250), primary_key=True, nullable=False)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Benchmarks of the auth and models of 0x01-Basic_authentication
+
+Users live in memory only: the cases never write the store to disk.
+"""
+
+from base64 import b64encode
+from typing import Callable, Dict
+
+PROJECT = "0x01-Basic_authentication"
+
+USERS = 1000
+EXCLUDED_PATHS = [
+    "/api/v1/status/",
+    "/api/v1/unauthorized/",
+    "/api/v1/forbidden/",
+    "/api/v1/stat*",
+]
+
+
+def setup() -> Dict[str, Callable[[], object]]:
+    """Create the cases of the suite"""
+    from werkzeug.test import EnvironBuilder
+
+    from api.v1.auth.auth import Auth
+    from api.v1.auth.basic_auth import BasicAuth
+    from models.base import DATA
+    from models.user import User
+
+    DATA["User"] = {}
+    for i in range(USERS):
+        user = User(email="user{}@example.com".format(i))
+        user.password = "password{}".format(i)
+        DATA["User"][user.id] = user
+
+    # The last user, so searches scan the whole store
+    user = DATA["User"][user.id]
+    credentials = b64encode(
+        "{}:password{}".format(user.email, USERS - 1).encode()
+    ).decode()
+    request = EnvironBuilder(
+        path="/api/v1/users/me",
+        headers={"Authorization": "Basic {}".format(credentials)},
+    ).get_request()
+
+    auth = Auth()
+    basic_auth = BasicAuth()
+
+    return {
+        "Auth.require_auth": lambda: auth.require_auth(
+            "/api/v1/users", EXCLUDED_PATHS
+        ),
+        "Auth.require_auth.excluded": lambda: auth.require_auth(
+            "/api/v1/status", EXCLUDED_PATHS
+        ),
+        "BasicAuth.current_user": lambda: basic_auth.current_user(request),
+        "Base.search": lambda: User.search({"email": user.email}),
+        "Base.get": lambda: User.get(user.id),
+        "Base.to_json": lambda: user.to_json(),
+    }
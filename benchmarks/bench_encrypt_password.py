@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""Benchmarks of hash_password and is_valid of 0x00-personal_data"""
+
+from typing import Callable, Dict
+
+PROJECT = "0x00-personal_data"
+
+PASSWORD = "MyAmazingPassword"
+
+
+def setup() -> Dict[str, Callable[[], object]]:
+    """Create the cases of the suite"""
+    from encrypt_password import hash_password, is_valid
+
+    hashed = hash_password(PASSWORD)
+
+    return {
+        "hash_password": lambda: hash_password(PASSWORD),
+        "is_valid": lambda: is_valid(hashed, PASSWORD),
+        "is_valid.wrong_password": lambda: is_valid(hashed, "wrong"),
+    }
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Benchmarks of the auth and models of 0x02-Session_authentication
+
+Sessions live in the memory store, and users in memory only: the cases
+never write the store to disk.
+"""
+
+import os
+from base64 import b64encode
+from typing import Callable, Dict
+
+PROJECT = "0x02-Session_authentication"
+
+USERS = 1000
+
+
+def setup() -> Dict[str, Callable[[], object]]:
+    """Create the cases of the suite"""
+    # The auth classes read their configuration when they're imported
+    for name in (
+        "SESSION_STORE",
+        "SESSION_SLIDING",
+        "RATE_LIMIT_PER_IP",
+        "RATE_LIMIT_PER_EMAIL",
+    ):
+        os.environ.pop(name, None)
+    os.environ["SESSION_DURATION"] = "3600"
+
+    from werkzeug.test import EnvironBuilder
+
+    from api.v1.auth.basic_auth import BasicAuth
+    from api.v1.auth.session_exp_auth import SessionExpAuth
+    from models.base import DATA
+    from models.user import User
+
+    DATA["User"] = {}
+    for i in range(USERS):
+        user = User(email="user{}@example.com".format(i))
+        user.password = "password{}".format(i)
+        DATA["User"][user.id] = user
+    User._rebuild_email_filter()
+
+    credentials = b64encode(
+        "{}:password{}".format(user.email, USERS - 1).encode()
+    ).decode()
+    request = EnvironBuilder(
+        path="/api/v1/users/me",
+        headers={"Authorization": "Basic {}".format(credentials)},
+    ).get_request()
+    basic_auth = BasicAuth()
+
+    session_exp_auth = SessionExpAuth()
+    session_id = session_exp_auth.create_session(user.id)
+
+    os.environ["SESSION_SLIDING"] = "1"
+    sliding_auth = SessionExpAuth()
+
+    return {
+        "BasicAuth.current_user": lambda: basic_auth.current_user(request),
+        "SessionExpAuth.user_id_for_session_id": lambda: (
+            session_exp_auth.user_id_for_session_id(session_id)
+        ),
+        "SessionExpAuth.user_id_for_session_id.sliding": lambda: (
+            sliding_auth.user_id_for_session_id(session_id)
+        ),
+        "SessionExpAuth.user_id_for_session_id.unknown": lambda: (
+            session_exp_auth.user_id_for_session_id("unknown")
+        ),
+    }
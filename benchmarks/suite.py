@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""Micro-benchmark suite of the hot functions of the projects
+
+Each `bench_*.py` module times the functions of one project. The projects
+ship packages of the same names (`api`, `models`), so every module runs in
+its own process with its project on the path, in a temporary directory.
+
+A run reports the nanoseconds per call of each case, with the environment it
+ran in, as json. Compared to a baseline, a case regresses when both its
+fastest and its median repeat are slower than those of the baseline by more
+than the threshold of the case: as with timeit, the fastest repeat is the
+one least disturbed by the rest of the machine, and the median confirms a
+slowdown isn't a single lucky repeat of the baseline. Each suite also times
+a fixed reference workload along with its cases, and timings are compared
+relative to it, so a machine running faster or slower as a whole doesn't
+show up as a change of the code. Run it from the root of the repository:
+
+```Bash
+python3 benchmarks/suite.py run -o report.json
+python3 benchmarks/suite.py run --compare benchmarks/baseline.json
+python3 benchmarks/suite.py compare old.json new.json
+python3 benchmarks/suite.py run --save-baseline
+```
+
+Configured through environment variables.
+
+```Bash
+BENCH_REPEAT -> Timed repeats of each case (Defaults to 7)
+BENCH_MIN_TIME -> Seconds each repeat lasts at least (Defaults to 0.1)
+BENCH_THRESHOLD -> Slowdown allowed by default, as a fraction of the
+    baseline (Defaults to 0.2)
+```
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+REFERENCE = "<reference>"
+# Statistics of the timings which all must slow down for a regression
+STATS = ("min_ns", "median_ns")
+SUITES = (
+    "bench_filtered_logger",
+    "bench_encrypt_password",
+    "bench_basic_auth",
+    "bench_session_auth",
+)
+
+
+def reference() -> int:
+    """Fixed pure Python workload, timed along with the cases of a suite"""
+    counts = {}
+    for i in range(200):
+        key = "key{}".format(i % 20)
+        counts[key] = counts.get(key, 0) + i
+    return sum(counts.values())
+
+
+def calibrate(function: Callable[[], object], min_time: float) -> int:
+    """Number of calls of a function lasting at least `min_time` seconds.
+
+    Args:
+        function (Callable[[], object]): The case, called without arguments.
+        min_time (float): Seconds the calls last at least.
+
+    Returns:
+        int: The number of calls.
+    """
+    loops = 1
+    while True:
+        elapsed = _time_loops(function, loops)
+        if elapsed >= min_time * 1e9:
+            return loops
+        loops *= 10 if elapsed < min_time * 1e8 else 2
+
+
+def time_cases(
+    cases: Dict[str, Callable[[], object]], repeat: int, min_time: float
+) -> Dict[str, dict]:
+    """Time cases, and the reference workload after each of them.
+
+    The repeats of the cases are interleaved, so a burst of load on the
+    machine slows down one repeat of many cases rather than every repeat of
+    one case. The garbage collector is disabled while timing, as timeit does.
+
+    Args:
+        cases (Dict[str, Callable[[], object]]): The cases, called without
+            arguments.
+        repeat (int): Number of timed repeats.
+        min_time (float): Seconds a repeat lasts at least.
+
+    Returns:
+        Dict[str, dict]: For each case and the reference, the calls per
+            repeat, and the min, median and standard deviation of the
+            nanoseconds per call of the repeats.
+    """
+    loops = {
+        case: calibrate(function, min_time)
+        for case, function in cases.items()
+    }
+    reference_loops = calibrate(reference, min_time)
+
+    timings = {case: [] for case in cases}
+    reference_timings = []
+    for _ in range(repeat):
+        for case, function in cases.items():
+            elapsed = _time_loops(function, loops[case])
+            timings[case].append(elapsed / loops[case])
+            elapsed = _time_loops(reference, reference_loops)
+            reference_timings.append(elapsed / reference_loops)
+
+    results = {
+        case: _summarize(timings[case], loops[case]) for case in cases
+    }
+    results[REFERENCE] = _summarize(reference_timings, reference_loops)
+    return results
+
+
+def _summarize(timings: List[float], loops: int) -> dict:
+    """Calls per repeat and statistics of the nanoseconds per call"""
+    return {
+        "loops": loops,
+        "min_ns": min(timings),
+        "median_ns": statistics.median(timings),
+        "stdev_ns": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def _time_loops(function: Callable[[], object], loops: int) -> int:
+    """Nanoseconds taken by `loops` calls of a function"""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            function()
+        return time.perf_counter_ns() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def run_suite(name: str) -> dict:
+    """Time the cases of a suite module, in this process.
+
+    Args:
+        name (str): Name of the module.
+
+    Returns:
+        dict: The timings of each case and of the reference workload.
+    """
+    module = importlib.import_module(name)
+    sys.path.insert(0, os.path.join(ROOT, module.PROJECT))
+    os.chdir(tempfile.mkdtemp(prefix="{}_".format(name)))
+
+    cases = module.setup()
+    repeat = int(os.getenv("BENCH_REPEAT", 7))
+    min_time = float(os.getenv("BENCH_MIN_TIME", 0.1))
+    results = time_cases(cases, repeat, min_time)
+
+    return {
+        "project": module.PROJECT,
+        "reference": results.pop(REFERENCE),
+        "cases": results,
+    }
+
+
+def run(suites=SUITES) -> dict:
+    """Run suites, each in its own process.
+
+    Args:
+        suites (Iterable[str], optional): Names of the suite modules.
+            Defaults to every suite.
+
+    Returns:
+        dict: The environment of the run and the results of the suites.
+    """
+    report = {"environment": environment(), "suites": {}}
+    for name in suites:
+        print("running {}".format(name), file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "_worker", name],
+            cwd=BENCH_DIR,
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+        report["suites"][name] = json.loads(completed.stdout)
+
+    return report
+
+
+def environment() -> dict:
+    """Describe where a run happens, so reports can be compared.
+
+    Returns:
+        dict: Date, commit, python, platform and cpu of the run.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _cpu_model() -> Optional[str]:
+    """Model of the cpu, read from /proc/cpuinfo on Linux"""
+    try:
+        with open("/proc/cpuinfo") as file:
+            for line in file:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+
+    return platform.processor() or None
+
+
+def compare(baseline: dict, report: dict) -> int:
+    """Print the change of each case from a baseline to a report.
+
+    Args:
+        baseline (dict): The baseline report, with optional `thresholds` of
+            the cases as fractions of their baseline timing.
+        report (dict): The new report.
+
+    Returns:
+        int: The number of cases which regressed.
+    """
+    default = float(os.getenv("BENCH_THRESHOLD", 0.2))
+    thresholds: Dict[str, float] = baseline.get("thresholds", {})
+
+    if _comparable(baseline["environment"]) != _comparable(
+        report["environment"]
+    ):
+        print(
+            "warning: the runs come from different environments, "
+            "timings may not be comparable"
+        )
+
+    print(
+        "{:<64} {:>12} {:>12} {:>8} {:>8}".format(
+            "case", "baseline ns", "ns", "min", "median"
+        )
+    )
+    regressions = 0
+    for suite, cases in _cases(report).items():
+        scales = [_scale(baseline, report, suite, stat) for stat in STATS]
+        for case, timing in cases.items():
+            key = "{}.{}".format(suite, case)
+            old = _cases(baseline).get(suite, {}).get(case)
+            if old is None:
+                print(
+                    "{:<64} {:>12} {:>12.0f} {:>8} {:>8}".format(
+                        key, "-", timing["min_ns"], "new", "new"
+                    )
+                )
+                continue
+
+            changes = [
+                timing[stat] / old[stat] * scale - 1
+                for stat, scale in zip(STATS, scales)
+            ]
+            regressed = min(changes) > thresholds.get(key, default)
+            regressions += regressed
+            print(
+                "{:<64} {:>12.0f} {:>12.0f} {:>+7.1%} {:>+7.1%}{}".format(
+                    key,
+                    old["min_ns"],
+                    timing["min_ns"],
+                    *changes,
+                    "  REGRESSION" if regressed else "",
+                )
+            )
+
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    """Print the timings of a report.
+
+    Args:
+        report (dict): The report.
+    """
+    print(
+        "{:<64} {:>12} {:>12} {:>8}".format(
+            "case", "min ns", "median ns", "stdev"
+        )
+    )
+    for suite, cases in _cases(report).items():
+        for case, timing in cases.items():
+            print(
+                "{:<64} {:>12.0f} {:>12.0f} {:>7.1%}".format(
+                    "{}.{}".format(suite, case),
+                    timing["min_ns"],
+                    timing["median_ns"],
+                    timing["stdev_ns"] / timing["median_ns"],
+                )
+            )
+
+
+def _cases(report: dict) -> Dict[str, dict]:
+    """Cases of the suites of a report"""
+    return {
+        suite: result["cases"] for suite, result in report["suites"].items()
+    }
+
+
+def _scale(baseline: dict, report: dict, suite: str, stat: str) -> float:
+    """Ratio of a statistic of the reference timings of a suite in a baseline
+    and a report, 1.0 if either has none"""
+    old = baseline["suites"].get(suite, {}).get("reference")
+    new = report["suites"].get(suite, {}).get("reference")
+    if old is None or new is None:
+        return 1.0
+
+    return old[stat] / new[stat]
+
+
+def _comparable(environment: dict) -> tuple:
+    """Parts of an environment which must match to compare timings"""
+    return (
+        environment.get("python"),
+        environment.get("implementation"),
+        environment.get("cpu"),
+    )
+
+
+def main():
+    """Run the suite"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument(
+        "-s", "--suite", action="append", choices=SUITES, dest="suites"
+    )
+    run_parser.add_argument("-o", "--output", help="Path of the json report")
+    run_parser.add_argument("--compare", help="Path of a baseline report")
+    run_parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Save the report as the baseline, keeping its thresholds",
+    )
+
+    compare_parser = commands.add_parser(
+        "compare", help="Compare two json reports"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("report")
+
+    worker_parser = commands.add_parser("_worker")
+    worker_parser.add_argument("suite", choices=SUITES)
+
+    args = parser.parse_args()
+
+    if args.command == "_worker":
+        sys.path.insert(0, BENCH_DIR)
+        print(json.dumps(run_suite(args.suite)))
+        return
+
+    if args.command == "compare":
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.report) as file:
+            report = json.load(file)
+        sys.exit(1 if compare(baseline, report) else 0)
+
+    report = run(args.suites or SUITES)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.save_baseline:
+        if os.path.exists(BASELINE):
+            with open(BASELINE) as file:
+                report["thresholds"] = json.load(file).get("thresholds", {})
+        with open(BASELINE, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+        print("baseline written to {}".format(BASELINE))
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        sys.exit(1 if compare(baseline, report) else 0)
+
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()